@@ -0,0 +1,350 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Headless benchmarks for the rasterizer and the drawing screen
+Runs on SDL's dummy video driver, so no window or display is needed
+
+    python benchmark.py                      # JSON results on stdout
+    python benchmark.py -o bench.json        # JSON results in a file
+    python benchmark.py --quick              # fewer sizes and repeats
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Must be set before pygame opens the display (main.init_display() does that)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import main
+main.init_display()
+from bresenham_line import (bresenham_line, bresenham_line_batch, bresenham_line_batch_parallel, bresenham_line_clipped,
+                            bresenham_spans, line_covers_cell, PatternCache)
+
+RESULTS_VERSION = 1
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules whose import cost is tracked; only main should bring in pygame
+IMPORT_MODULES = ["colors", "bresenham_line", "drawing_file", "png_export", "draw", "main"]
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+pygame = sys.modules.get("pygame")
+print(elapsed, pygame is not None, bool(pygame and pygame.display.get_init()), "numpy" in sys.modules)
+"""
+
+# (name, dx per unit of length, dy per unit of length)
+SLOPES = [
+    ("horizontal", 1, 0),
+    ("vertical", 0, 1),
+    ("diagonal", 1, 1),
+    ("shallow", 4, 1),
+    ("steep", 1, 4),
+]
+
+def time_call(func, repeat):
+    """Run func `repeat` times and return timing statistics in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+    }
+
+def random_lines(count, width, height, seed=0):
+    """Random lines inside a width x height grid, in the save file format"""
+    rng = random.Random(seed)
+    return [{
+        "start": [rng.randrange(width), rng.randrange(height)],
+        "end": [rng.randrange(width), rng.randrange(height)],
+        "color": list(rng.choice(main.COLOR_PALETTE)),
+    } for _ in range(count)]
+
+def load_test_drawing(cell_size, width, height, line_count):
+    """Write a random drawing to drawing.json and load it into the editor"""
+    with open("drawing.json", "w") as f:
+        json.dump({
+            "grid_size": [width, height],
+            "cell_size": cell_size,
+            "lines": random_lines(line_count, width, height),
+        }, f)
+    main.load_drawing()
+    main.current_state = main.STATE_DRAWING
+    return main.program_data["grid_width"], main.program_data["grid_height"]
+
+def bench_imports(repeat):
+    """Time importing each module in a fresh interpreter, and note what it pulled in"""
+    results = []
+    for module in IMPORT_MODULES:
+        times = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+                                    cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.split()
+            times.append(float(output[0]))
+        results.append({
+            "name": "import",
+            "params": {"module": module},
+            "repeat": repeat,
+            "min_s": min(times),
+            "median_s": statistics.median(times),
+            "mean_s": statistics.fmean(times),
+            "pygame_imported": output[1] == "True",
+            "display_opened": output[2] == "True",
+            "numpy_imported": output[3] == "True",
+        })
+    return results
+
+def bench_bresenham(lengths, repeat):
+    results = []
+    for length in lengths:
+        for slope, ux, uy in SLOPES:
+            x1, y1 = ux * length // max(ux, uy), uy * length // max(ux, uy)
+            results.append({
+                "name": "bresenham_line",
+                "params": {"length": length, "slope": slope},
+                **time_call(lambda: bresenham_line(0, 0, x1, y1), repeat),
+            })
+            results.append({
+                "name": "bresenham_spans",
+                "params": {"length": length, "slope": slope},
+                **time_call(lambda: bresenham_spans(0, 0, x1, y1), repeat),
+            })
+            results.append({
+                "name": "line_covers_cell",
+                "params": {"length": length, "slope": slope},
+                **time_call(lambda: line_covers_cell(0, 0, x1, y1, x1, y1), repeat),
+            })
+    return results
+
+def bench_bresenham_clipped(lengths, repeat):
+    """A long shallow line crossing an 80 x 60 view, clipped first or filtered after"""
+    results = []
+    view = (0, 0, 80, 60)
+    for length in lengths:
+        x0, x1 = -length // 2, length // 2
+        results.append({
+            "name": "bresenham_line_clipped",
+            "params": {"length": length},
+            **time_call(lambda: bresenham_line_clipped(x0, 3, x1, 40, view), repeat),
+        })
+        results.append({
+            "name": "bresenham_line_filtered",
+            "params": {"length": length},
+            **time_call(lambda: [(x, y) for x, y in bresenham_line(x0, 3, x1, 40) if 0 <= x < 80 and 0 <= y < 60],
+                        repeat),
+        })
+    return results
+
+def bench_pattern_cache(line_counts, repeat, shapes=50):
+    """Lines of a few shapes stamped at random positions, rasterized directly or through a pattern cache"""
+    results = []
+    rng = random.Random(2)
+    shape_list = [(rng.randrange(-40, 41), rng.randrange(-40, 41)) for _ in range(shapes)]
+    for count in line_counts:
+        endpoints = []
+        for _ in range(count):
+            dx, dy = rng.choice(shape_list)
+            x0, y0 = rng.randrange(200), rng.randrange(200)
+            endpoints.append((x0, y0, x0 + dx, y0 + dy))
+        results.append({
+            "name": "bresenham_line_stamped",
+            "params": {"lines": count, "shapes": shapes},
+            **time_call(lambda: [bresenham_line(*e) for e in endpoints], repeat),
+        })
+        cache = PatternCache()
+        results.append({
+            "name": "pattern_cache_stamped",
+            "params": {"lines": count, "shapes": shapes},
+            **time_call(lambda: [cache.line(*e) for e in endpoints], repeat),
+            "hit_rate": cache.hit_rate(),
+        })
+    return results
+
+def bench_bresenham_batch(line_counts, repeat):
+    results = []
+    for count in line_counts:
+        endpoints = [(*line["start"], *line["end"]) for line in random_lines(count, 200, 200)]
+        results.append({
+            "name": "bresenham_line_serial",
+            "params": {"lines": count},
+            **time_call(lambda: [bresenham_line(*e) for e in endpoints], repeat),
+        })
+        results.append({
+            "name": "bresenham_line_batch",
+            "params": {"lines": count},
+            **time_call(lambda: bresenham_line_batch(endpoints), repeat),
+        })
+        results.append({
+            "name": "bresenham_line_batch_parallel",
+            "params": {"lines": count, "workers": os.cpu_count()},
+            # Forced on at every size to show where the worker processes start paying off
+            **time_call(lambda: bresenham_line_batch_parallel(endpoints, min_cells=0), repeat),
+        })
+    return results
+
+def bench_frames(cell_sizes, line_counts, repeat):
+    results = []
+    for cell_size in cell_sizes:
+        for count in line_counts:
+            width, height = load_test_drawing(cell_size, 200, 200, count)
+            # Only the part of the grid that fits the window is drawn, as in the editor
+            params = {"cell_size": cell_size, "grid_width": width, "grid_height": height, "lines": count}
+
+            def full_frame():
+                main.screen_manager.fill(main.COLOR_BLACK)
+                main.grid.draw_grid()
+                main.draw_toolbar()
+                main.screen_manager.update()
+
+            def idle_frame():
+                main.canvas.blit_to(main.screen_manager, 0, main.TOOLBAR_HEIGHT)
+                main.draw_toolbar()
+                main.screen_manager.update()
+
+            steps = [1]
+
+            def pan_frame():
+                # Back and forth one cell, so the view never hits the edge of the grid
+                steps[0] = -steps[0]
+                main.pan_view(steps[0], 0)
+                main.canvas.blit_to(main.screen_manager, 0, main.TOOLBAR_HEIGHT)
+                main.draw_toolbar()
+                main.screen_manager.update()
+
+            main.pan_view(1, 0)
+            results.append({"name": "full_frame", "params": params, **time_call(full_frame, repeat)})
+            results.append({"name": "idle_frame", "params": params, **time_call(idle_frame, repeat)})
+            results.append({"name": "pan_frame", "params": params, **time_call(pan_frame, repeat)})
+    return results
+
+def bench_screens(repeat):
+    """The start screen and color dialog, which are mostly text"""
+    results = []
+    for name, draw in (("start_screen_frame", main.draw_start_screen), ("color_selector_frame", main.draw_color_selector)):
+        def frame():
+            draw()
+            main.screen_manager.update()
+
+        frame()  # Labels are rendered on the first frame and reused after
+        misses = main.text_cache.misses
+        results.append({"name": name, "params": {}, **time_call(frame, repeat),
+                        "text_renders": main.text_cache.misses - misses})
+    return results
+
+def bench_hit_test(line_counts, repeat, clicks=100):
+    results = []
+    for count in line_counts:
+        width, height = load_test_drawing(20, 200, 200, count)
+        rng = random.Random(1)
+        cell_size = main.grid.cell_size
+        positions = [(rng.randrange(width * cell_size), rng.randrange(height * cell_size) + main.TOOLBAR_HEIGHT)
+                     for _ in range(clicks)]
+        results.append({
+            "name": "find_line_at_point",
+            "params": {"lines": count, "clicks": clicks},
+            **time_call(lambda: [main.find_line_at_point(pos) for pos in positions], repeat),
+        })
+    return results
+
+def bench_erase(line_counts, repeat):
+    """Erase the first line of a drawing and draw it again, the worst case for renumbering later lines"""
+    results = []
+    for count in line_counts:
+        load_test_drawing(20, 200, 200, count)
+
+        def erase_and_redraw():
+            line_id, line, color = next(main.lines.items())
+            main.erase_line(line_id)
+            main.commit_line(line, color)
+
+        results.append({"name": "erase_line", "params": {"lines": count}, **time_call(erase_and_redraw, repeat)})
+    return results
+
+def bench_files(line_counts, repeat):
+    results = []
+    for count in line_counts:
+        load_test_drawing(20, 200, 200, count)
+
+        def round_trip():
+            main.save_drawing()
+            # Saving runs in the background, wait for it like the editor's next frames would
+            main.save_job.thread.join()
+            main.finish_save()
+            main.load_drawing()
+
+        results.append({"name": "save_load_round_trip", "params": {"lines": count}, **time_call(round_trip, repeat)})
+        def export():
+            main.export_as_png()
+            # Exporting runs in the background too
+            main.export_job.thread.join()
+            main.update_export_progress()
+
+        results.append({"name": "export_as_png", "params": {"lines": count}, **time_call(export, repeat)})
+    return results
+
+def run(quick=False):
+    repeat = 3 if quick else 10
+    line_counts = [10, 100] if quick else [10, 100, 1000, 10000]
+    results = []
+    results += bench_imports(3 if quick else 5)
+    results += bench_bresenham([10, 100] if quick else [10, 100, 1000], repeat * 10)
+    results += bench_bresenham_clipped([1000, 100000] if quick else [1000, 100000, 1000000], repeat)
+    results += bench_pattern_cache(line_counts, repeat)
+    results += bench_bresenham_batch(line_counts, repeat)
+    results += bench_frames([50, 20] if quick else [50, 20, 10], line_counts, repeat)
+    results += bench_screens(repeat)
+    results += bench_hit_test(line_counts, repeat)
+    results += bench_erase(line_counts, repeat)
+    results += bench_files(line_counts, repeat)
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+    }
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for SimpleLine")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and repeats")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+
+    # Saves and exports write into the working directory, keep them out of the repo
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            report = run(args.quick)
+        finally:
+            os.chdir(cwd)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -2,21 +2,179 @@
 # EARLAN JOSH Q. SABILLANO
 # JEA KATRINA G. JALANDONI
 
+import os
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Batches with fewer cells than this are rasterized in this process; below it,
+# starting worker processes and copying results back costs more than it saves
+PARALLEL_MIN_CELLS = 2_000_000
+PARALLEL_CHUNKS_PER_WORKER = 4  # More chunks than workers evens out slow chunks
+
+PATTERN_CACHE_SIZE = 1024  # Cell patterns kept by the default pattern cache
+PATTERN_CACHE_MAX_CELLS = 4096  # Longer lines are rasterized directly instead of filling the cache
+
+_pool = None  # Worker processes, started on the first big batch and reused after
+_pool_workers = 0
+
 # Processes Points and Generates
 class BresenhamPoints:
-    def __init__(self):
-        self.lines = []  # Store multiple lines as sets of points
-    
-    def add_line(self, points):
-        """Add a new line (list of points) to the collection"""
-        self.lines.append(points)
-    
-    def get_all_points(self):
-        """Get all points from all lines"""
-        all_points = []
-        for line in self.lines:
-            all_points.extend(line)
-        return all_points
+    """
+    The committed lines of a drawing, in drawing order, stored column by column
+    Every line gets an ID that never changes and that grows with drawing order, so the
+    line on top of a cell is the one with the highest ID. Endpoints live in one int32
+    column and colors in a palette index column, about 30 bytes per line.
+    Erasing only marks the line as gone; the columns are compacted once the erased
+    lines outnumber the rest, which keeps the IDs but drops the holes
+    """
+    COMPACT_MIN_ERASED = 1024  # Erased lines kept before compacting at all
+
+    def __init__(self, line_list=()):
+        self.endpoints = array("i")  # x0, y0, x1, y1 of every stored line
+        self.color_indices = array("I")  # Index into `palette` of every stored line
+        self.ids = array("q")  # ID of every stored line, increasing
+        self.alive = bytearray()  # 0 for erased lines
+        self.palette = []  # Colors used, in order of first use
+        self.palette_index = {}  # color -> index in palette
+        self.count = 0  # Lines not erased
+        self.next_id = 0
+        for line, color in line_list:
+            self.add(line, color)
+
+    @classmethod
+    def from_columns(cls, endpoints, color_indices, palette):
+        """
+        Build a store straight from an N x 4 endpoint array, N palette indices and the palette colors,
+        such as drawing_file.read_columns() returns, without going through a Python object per line
+        """
+        store = cls()
+        store.endpoints.frombytes(endpoints.astype("=i4").tobytes())
+        store.color_indices.frombytes(color_indices.astype("=u4").tobytes())
+        store.ids.extend(range(len(store.color_indices)))
+        store.alive = bytearray(b"\x01") * len(store.ids)
+        store.palette = [tuple(color) for color in palette]
+        store.palette_index = {}
+        for index, color in enumerate(store.palette):
+            store.palette_index.setdefault(color, index)
+        store.count = store.next_id = len(store.ids)
+        return store
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, line_id):
+        slot = self.slot(line_id)
+        return slot is not None and self.alive[slot]
+
+    def __iter__(self):
+        """Yield (line, color) for every line, in drawing order"""
+        for slot in range(len(self.ids)):
+            if self.alive[slot]:
+                yield self.line_at(slot), self.palette[self.color_indices[slot]]
+
+    def items(self):
+        """Yield (line ID, line, color) for every line, in drawing order"""
+        for slot in range(len(self.ids)):
+            if self.alive[slot]:
+                yield self.ids[slot], self.line_at(slot), self.palette[self.color_indices[slot]]
+
+    def slot(self, line_id):
+        """Get where a line ID is stored, or None"""
+        slot = bisect_left(self.ids, line_id)
+        return slot if slot < len(self.ids) and self.ids[slot] == line_id else None
+
+    def line_at(self, slot):
+        x0, y0, x1, y1 = self.endpoints[4 * slot:4 * slot + 4]
+        return ((x0, y0), (x1, y1))
+
+    def add(self, line, color):
+        """Add a line on top of the others and return its ID"""
+        (x0, y0), (x1, y1) = line
+        color = tuple(color)
+        color_index = self.palette_index.get(color)
+        if color_index is None:
+            color_index = self.palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        line_id = self.next_id
+        self.next_id += 1
+        self.endpoints.extend((x0, y0, x1, y1))
+        self.color_indices.append(color_index)
+        self.ids.append(line_id)
+        self.alive.append(1)
+        self.count += 1
+        return line_id
+
+    def line(self, line_id):
+        """Get the ((x0, y0), (x1, y1)) endpoints of a line"""
+        return self.line_at(self.slot(line_id))
+
+    def color(self, line_id):
+        return self.palette[self.color_indices[self.slot(line_id)]]
+
+    def id_at(self, position):
+        """Get the ID of the line `position` lines from the start (the inverse of position())"""
+        if self.count == len(self.ids):
+            return self.ids[position]
+        import numpy as np
+        return self.ids[int(np.flatnonzero(np.frombuffer(bytes(self.alive), dtype=np.uint8))[position])]
+
+    def columns(self):
+        """Get the IDs and the N x 4 endpoints of the lines, in drawing order, as numpy arrays"""
+        import numpy as np
+        alive = np.frombuffer(bytes(self.alive), dtype=bool)
+        ids = np.frombuffer(self.ids.tobytes(), dtype=np.int64)[alive]
+        endpoints = np.frombuffer(self.endpoints.tobytes(), dtype=np.int32).reshape(-1, 4)[alive]
+        return ids, endpoints
+
+    def position(self, line_id):
+        """Get how many lines come before this one (its index in a saved file)"""
+        slot = self.slot(line_id)
+        return slot - self.alive.count(0, 0, slot)
+
+    def erase(self, line_id):
+        """Remove a line, returning its (line, color); the other lines keep their IDs"""
+        slot = self.slot(line_id)
+        line, color = self.line_at(slot), self.palette[self.color_indices[slot]]
+        self.alive[slot] = 0
+        self.count -= 1
+        erased = len(self.ids) - self.count
+        if erased > max(self.COMPACT_MIN_ERASED, self.count):
+            self.compact()
+        return line, color
+
+    def compact(self):
+        """Drop the erased lines from the columns"""
+        keep = [slot for slot in range(len(self.ids)) if self.alive[slot]]
+        self.endpoints = array("i", (value for slot in keep for value in self.endpoints[4 * slot:4 * slot + 4]))
+        self.color_indices = array("I", (self.color_indices[slot] for slot in keep))
+        self.ids = array("q", (self.ids[slot] for slot in keep))
+        self.alive = bytearray(b"\x01") * len(keep)
+
+    def color_table(self):
+        """Get a list indexed by line ID of each line's color, with black for erased IDs"""
+        table = [(0, 0, 0)] * self.next_id
+        for line_id, line, color in self.items():
+            table[line_id] = color
+        return table
+
+    def copy(self):
+        """A snapshot that later edits do not change (for background saves)"""
+        snapshot = BresenhamPoints()
+        snapshot.endpoints = array("i", self.endpoints)
+        snapshot.color_indices = array("I", self.color_indices)
+        snapshot.ids = array("q", self.ids)
+        snapshot.alive = bytearray(self.alive)
+        snapshot.palette = list(self.palette)
+        snapshot.palette_index = dict(self.palette_index)
+        snapshot.count = self.count
+        snapshot.next_id = self.next_id
+        return snapshot
+
+    def memory(self):
+        """Bytes used by the columns"""
+        return (self.endpoints.itemsize * len(self.endpoints) + self.color_indices.itemsize * len(self.color_indices)
+                + self.ids.itemsize * len(self.ids) + len(self.alive))
 
 def bresenham_line(x0, y0, x1, y1):
     """
@@ -63,4 +221,359 @@ def bresenham_line(x0, y0, x1, y1):
             err += dx
             y0 += sy
     
-    return points
\ No newline at end of file
+    return points
+
+
+class PatternCache:
+    """
+    Least recently used cache of the cells of lines relative to their start
+    A line's cells only depend on (x1 - x0, y1 - y0), which holds its length along
+    each axis and its direction, so lines of the same shape anywhere share one pattern
+    """
+    def __init__(self, size=PATTERN_CACHE_SIZE, max_cells=PATTERN_CACHE_MAX_CELLS):
+        self.size = size  # Patterns kept before the least recently used one is dropped
+        self.max_cells = max_cells
+        # (x1 - x0, y1 - y0) -> (xs, ys) of the line from (0, 0), as int arrays: 8 bytes a cell
+        # instead of a tuple each, so a full cache stays in the tens of MB
+        self.patterns = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def line(self, x0, y0, x1, y1):
+        """bresenham_line(x0, y0, x1, y1), moved from a stored pattern when there is one"""
+        key = (x1 - x0, y1 - y0)
+        pattern = self.patterns.get(key)
+        if pattern is not None:
+            self.hits += 1
+            self.patterns.move_to_end(key)
+        else:
+            if max(abs(key[0]), abs(key[1])) >= self.max_cells or self.size <= 0:
+                return bresenham_line(x0, y0, x1, y1)
+            self.misses += 1
+            points = bresenham_line(0, 0, key[0], key[1])
+            pattern = self.patterns[key] = (array("i", [x for x, y in points]), array("i", [y for x, y in points]))
+            if len(self.patterns) > self.size:
+                self.patterns.popitem(last=False)
+            if x0 == 0 and y0 == 0:
+                return points
+        xs, ys = pattern
+        return [(x0 + x, y0 + y) for x, y in zip(xs, ys)]
+
+    def resize(self, size):
+        """Keep at most `size` patterns from now on (0 turns the cache off)"""
+        self.size = size
+        while len(self.patterns) > max(size, 0):
+            self.patterns.popitem(last=False)
+
+    def clear(self):
+        self.patterns = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self):
+        """Share of cached lookups served from a stored pattern"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Get the hit/miss counters"""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate(), "entries": len(self.patterns)}
+
+pattern_cache = PatternCache()
+
+def bresenham_line_cached(x0, y0, x1, y1):
+    """bresenham_line() through the shared pattern cache"""
+    return pattern_cache.line(x0, y0, x1, y1)
+
+def iter_bresenham_line(x0, y0, x1, y1):
+    """
+    bresenham_line() one point at a time, in the same order
+    For callers that may stop early; building the whole list is faster when every point is needed
+    """
+    if x0 == x1:
+        for y in range(min(y0, y1), max(y0, y1) + 1):
+            yield (x0, y)
+        return
+    if y0 == y1:
+        for x in range(min(x0, x1), max(x0, x1) + 1):
+            yield (x, y0)
+        return
+
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    err = dx - dy
+
+    while True:
+        yield (x0, y0)
+        if x0 == x1 and y0 == y1:
+            return
+        e2 = 2 * err
+        if e2 > -dy:
+            if x0 == x1:
+                return
+            err -= dy
+            x0 += sx
+        if e2 < dx:
+            if y0 == y1:
+                return
+            err += dx
+            y0 += sy
+
+def line_covers_cell(x0, y0, x1, y1, px, py):
+    """
+    Check whether (px, py) is one of the cells of bresenham_line(x0, y0, x1, y1), without rasterizing it
+    Cells outside the line's bounding box are rejected first; otherwise the line's cell in the
+    candidate column (or row, for steep lines) comes from the closed form of the error term
+    """
+    if not (min(x0, x1) <= px <= max(x0, x1) and min(y0, y1) <= py <= max(y0, y1)):
+        return False
+    # In the bounding box of a vertical or horizontal line means on it
+    if x0 == x1 or y0 == y1:
+        return True
+
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    if dx >= dy:
+        step = abs(px - x0)
+        return y0 + (1 if y0 < y1 else -1) * ((2 * step * dy + dx - 1) // (2 * dx)) == py
+    step = abs(py - y0)
+    return x0 + (1 if x0 < x1 else -1) * ((2 * step * dx + dy - 1) // (2 * dy)) == px
+
+def _visible_steps(x0, y0, x1, y1, clip):
+    """
+    Set up the closed form of a sloped line (neither vertical nor horizontal) clipped to `clip`
+    After i steps along the major axis the minor axis has moved (2 * i * minor + bias) // denominator
+    cells, the same cells as the error-term loop. Returns (x_major, major_start, major_sign, minor_start,
+    minor_sign, minor, bias, denominator, first, last) with first..last the visible steps, or None
+    """
+    left, top, right, bottom = clip
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    sx = 1 if x0 < x1 else -1
+    sy = 1 if y0 < y1 else -1
+    x_major = dx >= dy
+    if x_major:
+        major, minor = dx, dy
+        major_start, major_sign, major_lo, major_hi = x0, sx, left, right
+        minor_start, minor_sign, minor_lo, minor_hi = y0, sy, top, bottom
+    else:
+        major, minor = dy, dx
+        major_start, major_sign, major_lo, major_hi = y0, sy, top, bottom
+        minor_start, minor_sign, minor_lo, minor_hi = x0, sx, left, right
+    bias = major - 1
+    denominator = 2 * major
+
+    # Steps that keep the major axis inside the clip
+    if major_sign > 0:
+        first, last = major_lo - major_start, major_hi - 1 - major_start
+    else:
+        first, last = major_start - (major_hi - 1), major_start - major_lo
+    first, last = max(first, 0), min(last, major)
+
+    # Minor axis offsets inside the clip, then the steps that reach them
+    if minor_sign > 0:
+        low, high = minor_lo - minor_start, minor_hi - 1 - minor_start
+    else:
+        low, high = minor_start - (minor_hi - 1), minor_start - minor_lo
+    if low > 0:
+        first = max(first, -(-(low * denominator - bias) // (2 * minor)))
+    last = min(last, -(-((high + 1) * denominator - bias) // (2 * minor)) - 1)
+    if first > last:
+        return None
+    return x_major, major_start, major_sign, minor_start, minor_sign, minor, bias, denominator, first, last
+
+def bresenham_line_clipped(x0, y0, x1, y1, clip):
+    """
+    The cells of bresenham_line(x0, y0, x1, y1) inside clip = (left, top, right, bottom),
+    right and bottom exclusive, in the same order
+    The visible stretch of the line is worked out first, one axis at a time (Liang-Barsky
+    style), and only that stretch is walked, so a long line costs only what is inside `clip`
+    """
+    left, top, right, bottom = clip
+    if right <= left or bottom <= top:
+        return []
+
+    # Vertical and horizontal lines are walked from the smaller end
+    if x0 == x1:
+        if not left <= x0 < right:
+            return []
+        return [(x0, y) for y in range(max(min(y0, y1), top), min(max(y0, y1), bottom - 1) + 1)]
+    if y0 == y1:
+        if not top <= y0 < bottom:
+            return []
+        return [(x, y0) for x in range(max(min(x0, x1), left), min(max(x0, x1), right - 1) + 1)]
+
+    steps = _visible_steps(x0, y0, x1, y1, clip)
+    if steps is None:
+        return []
+    x_major, major_start, major_sign, minor_start, minor_sign, minor, bias, denominator, first, last = steps
+
+    # Start the error term exactly where the first visible step would have it
+    offset, error = divmod(2 * first * minor + bias, denominator)
+    major_pos = major_start + major_sign * first
+    minor_pos = minor_start + minor_sign * offset
+    points = []
+    for _ in range(last - first + 1):
+        points.append((major_pos, minor_pos) if x_major else (minor_pos, major_pos))
+        major_pos += major_sign
+        error += 2 * minor
+        if error >= denominator:
+            error -= denominator
+            minor_pos += minor_sign
+    return points
+
+def bresenham_spans(x0, y0, x1, y1, clip=None):
+    """
+    bresenham_line() as runs of cells in a row or column, optionally clipped like bresenham_line_clipped()
+    Returns (x, y, run_length, axis) spans in line order. A span covers run_length cells from
+    (x, y) towards increasing x (axis "x") or y (axis "y"). Costs one step per span, not per cell
+    """
+    if clip is None:
+        clip = (min(x0, x1), min(y0, y1), max(x0, x1) + 1, max(y0, y1) + 1)
+    left, top, right, bottom = clip
+    if right <= left or bottom <= top:
+        return []
+
+    if x0 == x1:
+        start, end = max(min(y0, y1), top), min(max(y0, y1), bottom - 1)
+        return [(x0, start, end - start + 1, "y")] if left <= x0 < right and start <= end else []
+    if y0 == y1:
+        start, end = max(min(x0, x1), left), min(max(x0, x1), right - 1)
+        return [(start, y0, end - start + 1, "x")] if top <= y0 < bottom and start <= end else []
+
+    steps = _visible_steps(x0, y0, x1, y1, clip)
+    if steps is None:
+        return []
+    x_major, major_start, major_sign, minor_start, minor_sign, minor, bias, denominator, first, last = steps
+
+    spans = []
+    offset = (2 * first * minor + bias) // denominator
+    step = first
+    while step <= last:
+        # The minor axis moves on at the first step reaching the next offset
+        end = min(-(-((offset + 1) * denominator - bias) // (2 * minor)) - 1, last)
+        major_pos = major_start + major_sign * (step if major_sign > 0 else end)
+        minor_pos = minor_start + minor_sign * offset
+        if x_major:
+            spans.append((major_pos, minor_pos, end - step + 1, "x"))
+        else:
+            spans.append((minor_pos, major_pos, end - step + 1, "y"))
+        step = end + 1
+        offset += 1
+    return spans
+
+def span_cells(span):
+    """The cells of one span, from its (x, y) onwards"""
+    x, y, length, axis = span
+    if axis == "x":
+        return [(x + k, y) for k in range(length)]
+    return [(x, y + k) for k in range(length)]
+
+def split_spans(spans, keep):
+    """Cut spans down to the runs of cells for which keep(cell) is true"""
+    result = []
+    for span in spans:
+        x, y, length, axis = span
+        run_start = None
+        for k, cell in enumerate(span_cells(span) + [None]):
+            if cell is not None and keep(cell):
+                if run_start is None:
+                    run_start = k
+            elif run_start is not None:
+                result.append((x + run_start, y, k - run_start, axis) if axis == "x"
+                              else (x, y + run_start, k - run_start, axis))
+                run_start = None
+    return result
+
+def bresenham_line_batch(endpoints):
+    """
+    Rasterizes many lines at once
+    Takes an N x 4 array of (x0, y0, x1, y1) endpoints and returns (xs, ys, offsets)
+    The cells of line i are xs[offsets[i]:offsets[i + 1]], ys[offsets[i]:offsets[i + 1]]
+    Cell-for-cell identical to calling bresenham_line() on each row
+    """
+    # Imported here so the plain rasterizer stays quick to import
+    import numpy as np
+
+    endpoints = np.asarray(endpoints, dtype=np.int64).reshape(-1, 4)
+    x0, y0, x1, y1 = (endpoints[:, i].copy() for i in range(4))
+
+    # bresenham_line() walks vertical and horizontal lines from the smaller end
+    vertical = x0 == x1
+    horizontal = (y0 == y1) & ~vertical
+    y0[vertical], y1[vertical] = np.minimum(y0, y1)[vertical], np.maximum(y0, y1)[vertical]
+    x0[horizontal], x1[horizontal] = np.minimum(x0, x1)[horizontal], np.maximum(x0, x1)[horizontal]
+
+    dx = np.abs(x1 - x0)
+    dy = np.abs(y1 - y0)
+    sx = np.where(x0 < x1, 1, -1)
+    sy = np.where(y0 < y1, 1, -1)
+    x_major = dx >= dy
+    major = np.maximum(dx, dy)
+    minor = np.minimum(dx, dy)
+
+    # One cell per step along the major axis
+    counts = major + 1
+    offsets = np.zeros(len(endpoints) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    line_of = np.repeat(np.arange(len(endpoints)), counts)
+    step = np.arange(offsets[-1], dtype=np.int64) - offsets[line_of]
+
+    # Minor axis offset after `step` major steps of the error-term loop above
+    major, minor = major[line_of], minor[line_of]
+    minor_step = (2 * step * minor + np.maximum(major - 1, 0)) // (2 * np.maximum(major, 1))
+
+    x_major = x_major[line_of]
+    xs = x0[line_of] + sx[line_of] * np.where(x_major, step, minor_step)
+    ys = y0[line_of] + sy[line_of] * np.where(x_major, minor_step, step)
+    return xs, ys, offsets
+
+
+def _rasterize_chunk(endpoints):
+    """Worker side of bresenham_line_batch_parallel(): the cells of one chunk, as int32 to halve the copy back"""
+    import numpy as np
+
+    xs, ys, offsets = bresenham_line_batch(endpoints)
+    return xs.astype(np.int32), ys.astype(np.int32)
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        if _pool is not None:
+            _pool.shutdown()
+        # Spawned, not forked: the editor has pygame and background threads running
+        _pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        _pool_workers = workers
+    return _pool
+
+def bresenham_line_batch_parallel(endpoints, workers=None, min_cells=PARALLEL_MIN_CELLS):
+    """
+    bresenham_line_batch() split across worker processes for big batches
+    The lines are cut into chunks of about the same number of cells and the results
+    are joined back in order, so the output is identical to bresenham_line_batch().
+    Uses this process alone with one worker or under `min_cells` cells
+    """
+    import numpy as np
+
+    endpoints = np.asarray(endpoints, dtype=np.int64).reshape(-1, 4)
+    workers = workers or os.cpu_count() or 1
+    counts = np.maximum(np.abs(endpoints[:, 2] - endpoints[:, 0]), np.abs(endpoints[:, 3] - endpoints[:, 1])) + 1
+    total = int(counts.sum())
+    if workers < 2 or total < min_cells:
+        return bresenham_line_batch(endpoints)
+
+    chunk_count = min(len(endpoints), workers * PARALLEL_CHUNKS_PER_WORKER)
+    bounds = np.searchsorted(np.cumsum(counts), total * np.arange(1, chunk_count) // chunk_count)
+    chunks = np.split(endpoints, np.unique(bounds))
+    results = list(_get_pool(workers).map(_rasterize_chunk, chunks))
+
+    offsets = np.zeros(len(endpoints) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    xs = np.concatenate([chunk_xs for chunk_xs, chunk_ys in results], dtype=np.int64)
+    ys = np.concatenate([chunk_ys for chunk_xs, chunk_ys in results], dtype=np.int64)
+    return xs, ys, offsets
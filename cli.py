@@ -0,0 +1,199 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+SimpleLine without the window: the rasterizer and file formats for scripts and pipelines
+
+    python cli.py render drawing.json [more.sldr ...]     # PNG next to each drawing
+    python cli.py convert drawing.json --to sldr           # drawing.sldr (journal edits included)
+    python cli.py rasterize < endpoints.txt                # cells of each line on stdout
+
+Several files are processed in parallel, one per worker process (-j to choose how many).
+`rasterize` reads one line per input line as "x0 y0 x1 y1" (commas also work) and writes
+its cells as "x,y x,y ..." on one output line, a batch at a time so input of any length streams
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import drawing_file
+
+RASTERIZE_BATCH_LINES = 4096  # Input lines rasterized together
+
+# Exceptions that mean a bad input file rather than a bug, reported per file like the editor does
+# (JSONDecodeError and drawing_file.DrawingFormatError are ValueErrors too)
+FILE_ERRORS = (OSError, ValueError, OverflowError, KeyError, IndexError)
+
+FORMAT_EXTENSIONS = {"json": ".json", "sldr": drawing_file.BINARY_EXTENSION}
+
+def output_path(path, extension, output_dir=None):
+    """`path` with its extension replaced, in `output_dir` if given"""
+    base = os.path.splitext(path)[0] + extension
+    if output_dir:
+        base = os.path.join(output_dir, os.path.basename(base))
+    return base
+
+def make_output_dir(output_dir):
+    """Create -d/--output-dir if it is missing; False (after printing why) if that fails"""
+    if not output_dir:
+        return True
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Error: cannot create {output_dir}: {e}", file=sys.stderr)
+        return False
+    return True
+
+def render_file(path, out_path, scale=1.0, cell_pixels=None, workers=None):
+    """Render one drawing to a PNG, as the editor's export does"""
+    # Imported here so convert and rasterize start without pulling in the exporter
+    import png_export
+
+    save_data, lines, edit_count = drawing_file.read_drawing_with_journal(path)
+    width, height = save_data["grid_size"]
+    if cell_pixels is None:
+        cell_pixels = max(1, round(save_data["cell_size"] * scale))
+    png_export.export_png(out_path, width, height, lines, cell_pixels, workers=workers)
+    return f"{path} -> {out_path}"
+
+def convert_file(path, out_path):
+    """Rewrite one drawing in the format `out_path` asks for, folding in its journal"""
+    save_data, lines, edit_count = drawing_file.read_drawing_with_journal(path)
+    drawing_file.write_drawing(out_path, save_data["grid_size"], save_data["cell_size"], lines)
+    return f"{path} -> {out_path} ({len(lines)} lines)"
+
+def run_jobs(func, tasks, jobs):
+    """
+    Run func(*task) for every task, in worker processes when there is more than one
+    Prints a line per finished task and returns how many failed
+    """
+    failed = 0
+    if jobs == 1 or len(tasks) == 1:
+        for task in tasks:
+            try:
+                print(func(*task))
+            except FILE_ERRORS as e:
+                print(f"Error: {task[0]}: {e}", file=sys.stderr)
+                failed += 1
+        return failed
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(func, *task): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                print(future.result())
+            except FILE_ERRORS as e:
+                print(f"Error: {futures[future][0]}: {e}", file=sys.stderr)
+                failed += 1
+    return failed
+
+def parse_endpoints(text):
+    """Read "x0 y0 x1 y1" (spaces and/or commas) into a tuple of 4 ints"""
+    values = text.replace(",", " ").split()
+    if len(values) != 4:
+        raise ValueError(f"expected x0 y0 x1 y1, got {text.strip()!r}")
+    return tuple(int(value) for value in values)
+
+def write_cells(out, batch, clip=None):
+    """Rasterize a batch of endpoints and write one line of cells per endpoint"""
+    from bresenham_line import bresenham_line_batch, bresenham_line_clipped
+
+    if clip is not None:
+        # Only the part inside the clip is walked, however long the line
+        for endpoints in batch:
+            out.write(" ".join(f"{x},{y}" for x, y in bresenham_line_clipped(*endpoints, clip)))
+            out.write("\n")
+        return
+
+    xs, ys, offsets = bresenham_line_batch(batch)
+    xs, ys, offsets = xs.tolist(), ys.tolist(), offsets.tolist()
+    for i in range(len(batch)):
+        start, end = offsets[i], offsets[i + 1]
+        out.write(" ".join(f"{x},{y}" for x, y in zip(xs[start:end], ys[start:end])))
+        out.write("\n")
+
+def rasterize_stream(source, out, clip=None):
+    """
+    Rasterize every endpoint line from `source`, skipping blank lines and # comments
+    With `clip` = (left, top, right, bottom), only cells inside it are written
+    """
+    batch = []
+    for number, text in enumerate(source, 1):
+        if not text.strip() or text.lstrip().startswith("#"):
+            continue
+        try:
+            batch.append(parse_endpoints(text))
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+        if len(batch) == RASTERIZE_BATCH_LINES:
+            write_cells(out, batch, clip)
+            batch = []
+    if batch:
+        write_cells(out, batch, clip)
+
+def command_render(args):
+    if not make_output_dir(args.output_dir):
+        return 1
+    # One file can use every worker to rasterize; several files already get a process each
+    workers = args.jobs if len(args.files) == 1 else 1
+    tasks = [(path, output_path(path, ".png", args.output_dir), args.scale, args.cell_pixels, workers)
+             for path in args.files]
+    return run_jobs(render_file, tasks, args.jobs)
+
+def command_convert(args):
+    if not make_output_dir(args.output_dir):
+        return 1
+    tasks = [(path, output_path(path, FORMAT_EXTENSIONS[args.to], args.output_dir)) for path in args.files]
+    same = [path for path, out_path in tasks if os.path.abspath(path) == os.path.abspath(out_path)]
+    if same:
+        print(f"Error: {same[0]} is already a {args.to} file", file=sys.stderr)
+        return len(same)
+    return run_jobs(convert_file, tasks, args.jobs)
+
+def command_rasterize(args):
+    try:
+        rasterize_stream(sys.stdin, sys.stdout, args.clip)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="SimpleLine's rasterizer and file formats, without a window")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_file_options(command):
+        command.add_argument("files", nargs="+", help="drawing files (.json or .sldr)")
+        command.add_argument("-d", "--output-dir", help="write outputs here instead of next to each input")
+        command.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                             help="worker processes for several files (default: one per CPU)")
+
+    render = commands.add_parser("render", help="render drawings to PNG")
+    add_file_options(render)
+    render.add_argument("--scale", type=float, default=1.0, help="multiply the saved cell size (default 1)")
+    render.add_argument("--cell-pixels", type=int, help="pixels per cell, instead of the saved cell size")
+    render.set_defaults(func=command_render)
+
+    convert = commands.add_parser("convert", help="convert drawings between JSON and the binary format")
+    add_file_options(convert)
+    convert.add_argument("--to", choices=sorted(FORMAT_EXTENSIONS), required=True, help="format to write")
+    convert.set_defaults(func=command_convert)
+
+    rasterize = commands.add_parser("rasterize", help="rasterize endpoints from stdin to cells on stdout")
+    rasterize.add_argument("--clip", nargs=4, type=int, metavar=("LEFT", "TOP", "RIGHT", "BOTTOM"),
+                           help="only write cells inside this rectangle (right and bottom exclusive)")
+    rasterize.set_defaults(func=command_rasterize)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "jobs", 1) < 1:
+        parser.error("--jobs must be at least 1")
+    if getattr(args, "cell_pixels", None) is not None and args.cell_pixels < 1:
+        parser.error("--cell-pixels must be at least 1")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    sys.exit(1 if args.func(args) else 0)
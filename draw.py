@@ -6,6 +6,7 @@ import pygame
 from pygame.locals import * 
 from colors import * 
 import math
+import numpy as np
 from initial_values import *
 
 class Grid(InitialValues):
@@ -14,22 +15,33 @@ class Grid(InitialValues):
     Reposition
     Zoom in Zoom Out
     """
-    def __init__(self, screen):
-        self.zoom_level: int = InitialValues.ZOOM_LEVEL 
-        self.cell_size: int = InitialValues.CELL_SIZE * self.zoom_level
+    def __init__(self, screen, width=10, height=10, cell_size=InitialValues.CELL_SIZE):
+        self.zoom_level: float = InitialValues.ZOOM_LEVEL 
+        self.base_cell_size: int = cell_size  # Cell size at zoom level 1
+        self.cell_size: int = cell_size * self.zoom_level
+        # First grid cell shown in the top left corner, moved by panning
         self.x_map_displacement: int = 0
         self.y_map_displacement: int = 0
         self.screen = screen
-        self.cells = []  # cells where bresenham line is drawn
-        self.temp_cells = [] # temporary cell duplicated from `cells` to show where bresenham could be drawn.
+        # cells where bresenham line is drawn, indexed [x, y]. One byte per cell: 0 is empty, anything else a color index
+        self.cells = np.zeros((width, height), dtype=np.uint8)
+        self.temp_cells = np.zeros_like(self.cells) # temporary cell duplicated from `cells` to show where bresenham could be drawn.
 
     # View Functions
     def zoom(self, zoom_level):
+        """Scale the cells, zoom level 1 being `base_cell_size`; cells stay at least a pixel wide"""
         self.zoom_level = zoom_level
-        self.cell_size: int = 50 * self.zoom_level
+        self.cell_size: int = max(1, round(self.base_cell_size * self.zoom_level))
+
+    def zoom_step(self, steps):
+        """Get the zoom level `steps` entries up or down ZOOM_LEVELS from the current one"""
+        levels = InitialValues.ZOOM_LEVELS
+        i = levels.index(self.zoom_level) if self.zoom_level in levels else levels.index(1)
+        return levels[max(0, min(i + steps, len(levels) - 1))]
 
     def move(self, new_displacement):
-        pass
+        """Pan so that cell (x, y) of `new_displacement` is in the top left corner"""
+        self.x_map_displacement, self.y_map_displacement = new_displacement
 
     def convert_world_coordinates_to_grid_coordinates(self, x, y):
         """ 
@@ -38,8 +50,8 @@ class Grid(InitialValues):
         Because cell size is 50
         Accounts for x_y displacement
         """
-        grid_x = math.floor(x/self.cell_size)
-        grid_y = math.floor(y/self.cell_size)
+        grid_x = math.floor(x/self.cell_size) + self.x_map_displacement
+        grid_y = math.floor(y/self.cell_size) + self.y_map_displacement
         return grid_x, grid_y
 
     # Might not implement
@@ -50,47 +62,55 @@ class Grid(InitialValues):
     def draw_grid(self) -> None:
         # Get full width window...
 
-        for x in range(0, 10):
-            self.cells.append([])
-            for y in range(0, 10):
-                self.cells[x].append(0)
+        width, height = self.cells.shape
+        for x in range(0, width):
+            for y in range(0, height):
                 pygame.draw.rect(self.screen, COLOR_WHITE, 
                         pygame.Rect(x*self.cell_size, y*self.cell_size, self.cell_size, self.cell_size), 1) 
         # print(self.cells)
         pygame.display.flip()  # Updates Screen
 
     def draw_cells(self, active_color, inactive_color=COLOR_BLACK, temp_cells=None):
-        x_loop = 0
-        y_loop = 0
-
-        if temp_cells != None:
-            cells = temp_cells
+        """
+        Draw every cell in one blit
+        Cells set to 1 use `active_color`, cells set to 0 use `inactive_color`
+        and any other value is left untouched
+        """
+        if temp_cells is not None:
+            cells = np.asarray(temp_cells)
         else: 
             cells = self.cells
-        for line in cells:
-            for i in line:
-                if i == 1:
-                    pygame.draw.rect(self.screen, active_color, 
-                                pygame.Rect(y_loop*self.cell_size, x_loop*self.cell_size, self.cell_size, self.cell_size), 0)
-                elif i == 0:
-                    pygame.draw.rect(self.screen, inactive_color, 
-                                pygame.Rect(y_loop*self.cell_size, x_loop*self.cell_size, self.cell_size, self.cell_size), 0)    
-                x_loop += 1
-            y_loop += 1
-            x_loop = 0
+
+        # Pick a transparent key that neither color uses
+        colorkey = (255, 0, 255)
+        while colorkey in (tuple(active_color), tuple(inactive_color)):
+            colorkey = (colorkey[0] - 1, 0, 255)
+
+        # One pixel per cell, then scale up to the cell size
+        pixels = np.empty(cells.shape + (3,), dtype=np.uint8)
+        pixels[:] = colorkey
+        pixels[cells == 1] = active_color
+        pixels[cells == 0] = inactive_color
+        surface = pygame.surfarray.make_surface(pixels)
+        surface.set_colorkey(colorkey)
+        surface = pygame.transform.scale(surface, (cells.shape[0] * self.cell_size, cells.shape[1] * self.cell_size))
+        self.screen.blit(surface, (0, 0))
 
     def edit_array_from_list(self, list_of_x_y):
-        for i in range(0, len(list_of_x_y)):
-            self.edit_array(list_of_x_y[i][0], list_of_x_y[i][1], 1)
+        """Set every (x, y) in the list to 1 at once"""
+        if len(list_of_x_y) == 0:
+            return
+        points = np.asarray(list_of_x_y)
+        self.edit_array(points[:, 0], points[:, 1], 1)
 
     def edit_array(self, x, y, val):
-        self.cells[x][y] = val
+        """Set one cell, or many at once when x and y are arrays"""
+        self.cells[x, y] = val
 
     def flip_cell(self, x, y):
-        if self.cells[x][y] == 1:
-            self.edit_array(x,y, 0)
-        elif self.cells[x][y] == 0:
-            self.edit_array(x,y, 1)
+        """Flip cells between 0 and 1, one cell or many at once when x and y are arrays"""
+        current = self.cells[x, y]
+        self.edit_array(x, y, np.where(current == 1, 0, np.where(current == 0, 1, current)))
 
     def select_dot_from_mouse_coordinates(self, mouse_x, mouse_y):
         # Array or not array
@@ -103,3 +123,163 @@ class Grid(InitialValues):
     
 
 
+# Pre-rendered grid layers keyed by (cell_size, width, height, thickness), one per zoom level
+GRID_LAYER_CACHE_SIZE = len(InitialValues.ZOOM_LEVELS)
+_grid_layers = {}
+
+def get_grid_layers(cell_size, width, height, thickness):
+    """
+    Get the (background, overlay) surfaces of a grid, rendering them only the first time
+    background: black, with a white outline around every cell
+    overlay: transparent, with the grey grid lines
+    Cells smaller than GRID_LINE_MIN_CELL_PIXELS would be all outline and grid line, so
+    their background is plain black and the overlay is None
+    """
+    key = (cell_size, width, height, thickness)
+    layers = _grid_layers.get(key)
+    if layers is not None:
+        return layers
+
+    # Grid lines are `thickness` wide, so the last ones need a little extra room
+    size = (width * cell_size + thickness, height * cell_size + thickness)
+    background = pygame.Surface(size)
+    background.fill(COLOR_BLACK)
+    overlay = None
+    if cell_size >= GRID_LINE_MIN_CELL_PIXELS:
+        for x in range(width):
+            for y in range(height):
+                pygame.draw.rect(background, COLOR_WHITE, pygame.Rect(x * cell_size, y * cell_size, cell_size, cell_size), 1)
+
+        overlay = pygame.Surface(size, pygame.SRCALPHA)
+        for x in range(width + 1):
+            pygame.draw.line(overlay, COLOR_GREY, (x * cell_size, 0), (x * cell_size, height * cell_size), thickness)
+        for y in range(height + 1):
+            pygame.draw.line(overlay, COLOR_GREY, (0, y * cell_size), (width * cell_size, y * cell_size), thickness)
+
+    # Drop the oldest grid once the cache is full
+    if len(_grid_layers) >= GRID_LAYER_CACHE_SIZE:
+        del _grid_layers[next(iter(_grid_layers))]
+    layers = _grid_layers[key] = (background, overlay)
+    return layers
+
+class Canvas:
+    """
+    Offscreen copy of the visible part of the committed drawing
+    Only the cells of lines that changed get repainted, and only the
+    repainted area is copied to the screen.
+    The canvas shows `width` x `height` grid cells starting at `origin`. Cells are
+    given in grid coordinates as (x, y, run_length, axis) spans and must be in view:
+    clip lines to visible_cells() (bresenham_spans) rather than handing over every cell
+    """
+    def __init__(self, width, height, cell_size, origin=(0, 0)):
+        self.width = width  # in cells
+        self.height = height  # in cells
+        self.origin = origin  # Grid cell shown in the top left corner
+        self.cell_size = cell_size
+        self.line_thickness = 1 if cell_size < 40 else 2
+        self.background, self.overlay = get_grid_layers(cell_size, width, height, self.line_thickness)
+        self.surface = pygame.Surface(self.background.get_size())
+        self.dirty_area = None  # Part of the surface not copied to the screen yet
+
+    def visible_cells(self):
+        """Get the (x0, y0, x1, y1) grid cells shown, end exclusive"""
+        return self.origin[0], self.origin[1], self.origin[0] + self.width, self.origin[1] + self.height
+
+    def is_visible(self, x, y):
+        return 0 <= x - self.origin[0] < self.width and 0 <= y - self.origin[1] < self.height
+
+    def cell_rect(self, x, y):
+        return pygame.Rect((x - self.origin[0]) * self.cell_size, (y - self.origin[1]) * self.cell_size,
+                           self.cell_size, self.cell_size)
+
+    def span_rect(self, span):
+        """Get the rect covering a (x, y, run_length, axis) span of cells"""
+        x, y, length, axis = span
+        rect = self.cell_rect(x, y)
+        if axis == "x":
+            rect.width *= length
+        else:
+            rect.height *= length
+        return rect
+
+    def paint_rect(self, rect, color):
+        """Fill `rect` with `color`, or clear it to empty outlined cells if color is None"""
+        if color is None:
+            self.surface.blit(self.background, rect, rect)
+        else:
+            self.surface.fill(color, rect)
+
+    def paint_cell(self, x, y, color):
+        """Fill a cell with `color`, or clear it to an empty outlined cell if color is None"""
+        self.paint_rect(self.cell_rect(x, y), color)
+
+    def draw_grid_lines(self, area):
+        """Redraw the grid lines crossing `area` on top of the cells"""
+        if self.overlay is not None:
+            self.surface.blit(self.overlay, area, area)
+
+    def mark_dirty(self, area):
+        self.dirty_area = area if self.dirty_area is None else self.dirty_area.union(area)
+
+    def redraw(self, span_colors):
+        """Repaint everything from an iterable of (span, color) for the drawn runs of cells"""
+        self.surface.blit(self.background, (0, 0))
+        for span, color in span_colors:
+            self.paint_rect(self.span_rect(span), color)
+        self.draw_grid_lines(self.surface.get_rect())
+        self.mark_dirty(self.surface.get_rect())
+
+    def repaint(self, spans, color_at):
+        """
+        Repaint the cells of the given spans with color_at((x, y)) and redraw the grid lines over them
+        Each run of cells of one color is filled with a single rect
+        """
+        area = None
+        for x, y, length, axis in spans:
+            dx, dy = (1, 0) if axis == "x" else (0, 1)
+            run_start, run_color = 0, color_at((x, y))
+            for k in range(1, length + 1):
+                color = color_at((x + k * dx, y + k * dy)) if k < length else None
+                if k < length and color == run_color:
+                    continue
+                self.paint_rect(self.span_rect((x + run_start * dx, y + run_start * dy, k - run_start, axis)),
+                                run_color)
+                run_start, run_color = k, color
+            rect = self.span_rect((x, y, length, axis))
+            area = rect if area is None else area.union(rect)
+        if area is not None:
+            area = area.inflate(2 * self.line_thickness, 2 * self.line_thickness).clip(self.surface.get_rect())
+            self.draw_grid_lines(area)
+            self.mark_dirty(area)
+
+    def invalidate(self):
+        """Copy the whole canvas to the screen again on the next blit"""
+        self.mark_dirty(self.surface.get_rect())
+
+    def blit_to(self, screen_manager, x_offset, y_offset):
+        """Copy the changed part of the canvas to the screen, if anything changed"""
+        if self.dirty_area is None:
+            return
+        screen_manager.blit(self.surface, (self.dirty_area.x + x_offset, self.dirty_area.y + y_offset), self.dirty_area)
+        self.dirty_area = None
+
+    def span_areas(self, spans):
+        """
+        Get the area of each span
+        Painting a cell and then its grid lines never changes pixels outside the
+        cell (grid line pixels are grey either way), so this is all that needs restoring
+        """
+        for span in spans:
+            yield self.span_rect(span)
+
+    def draw_grid_lines_over(self, screen_manager, spans, x_offset, y_offset):
+        """Draw the grid lines over spans that were painted directly on the screen"""
+        if self.overlay is None:
+            return
+        for area in self.span_areas(spans):
+            screen_manager.blit(self.overlay, (area.x + x_offset, area.y + y_offset), area)
+
+    def restore(self, screen_manager, spans, x_offset, y_offset):
+        """Copy the canvas back over spans that were painted directly on the screen"""
+        for area in self.span_areas(spans):
+            screen_manager.blit(self.surface, (area.x + x_offset, area.y + y_offset), area)
@@ -0,0 +1,265 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Reading and writing drawing files
+A drawing is a list of [(start, end), color] lines plus the grid and cell size
+
+Two formats: JSON for interchange, and a compact binary one (.sldr):
+    header   44 bytes  magic "SLDR", version u16, flags u16, grid width u32, grid height u32,
+                       cell size u32, palette size u32, line count u32, revision (16 bytes, zero if none)
+    palette  4 bytes per color: r, g, b, unused
+    lines    line count x 4 int32: x0, y0, x1, y1
+    colors   line count uint16 palette indices
+All numbers are little-endian
+"""
+
+import json
+import mmap
+import os
+import struct
+import uuid
+
+BINARY_MAGIC = b"SLDR"
+BINARY_VERSION = 1
+BINARY_EXTENSION = ".sldr"
+BINARY_HEADER = struct.Struct("<4sHHIIIII16s")
+BINARY_MAX_COLORS = 1 << 16  # Palette indices are uint16
+
+class DrawingFormatError(ValueError):
+    """A drawing file that is not in a format we can read"""
+
+def new_revision():
+    """A fresh id tying a saved file to the journal written after it"""
+    return uuid.uuid4().hex
+
+def parse_point(point):
+    """Read a point saved as [x, y] or {"x": x, "y": y}"""
+    if isinstance(point, list):
+        return (point[0], point[1])
+    return (point["x"], point["y"])
+
+def parse_color(color):
+    """Read a color saved as a list, a tuple or a "#rrggbb" hex string"""
+    if isinstance(color, str) and color.startswith("#"):
+        return (int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16))
+    if isinstance(color, list):
+        return tuple(color)
+    return color
+
+def parse_line(line_data):
+    """Read one saved line into the editor's [(start, end), color] form"""
+    return [(parse_point(line_data["start"]), parse_point(line_data["end"])), parse_color(line_data["color"])]
+
+def format_line(line, color):
+    """Write one line as a JSON object, without going through json.dumps"""
+    (x0, y0), (x1, y1) = line
+    return f'{{"start": [{x0}, {y0}], "end": [{x1}, {y1}], "color": [{", ".join(map(str, color))}]}}'
+
+def write_json(path, grid_size, cell_size, lines, revision=None):
+    """
+    Stream a drawing to `path` one line at a time
+    Writes to a temporary file first and renames it over `path`, so a failed
+    save never leaves a half-written drawing behind
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        f.write(f'{{"grid_size": [{grid_size[0]}, {grid_size[1]}], "cell_size": {cell_size}, ')
+        if revision is not None:
+            f.write(f'"revision": "{revision}", ')
+        f.write('"lines": [')
+        for i, (line, color) in enumerate(lines):
+            if i:
+                f.write(", ")
+            f.write(format_line(line, color))
+        f.write("]}")
+    os.replace(temp_path, path)
+
+    # Edits journaled against the old file no longer apply
+    remove_journal(path)
+
+def read_json(path):
+    """Read a drawing file, returning (save_data, lines)"""
+    with open(path, "r") as f:
+        save_data = json.load(f)
+    return save_data, [parse_line(line_data) for line_data in save_data["lines"]]
+
+def lines_to_columns(lines):
+    """
+    Turn [(start, end), color] lines into (endpoints, color_indices, palette) arrays like read_binary()'s:
+    an N x 4 int32 array, N uint32 palette indices and a P x 4 uint8 palette (r, g, b, unused)
+    The indices are wider than the binary format's, so JSON drawings with any number of colors load
+    """
+    # Only the binary format needs numpy, JSON-only users skip importing it
+    import numpy as np
+
+    palette = {}  # color -> palette index
+    color_indices = np.fromiter((palette.setdefault(tuple(color), len(palette)) for line, color in lines),
+                                dtype="<u4", count=len(lines))
+    endpoints = np.array([(x0, y0, x1, y1) for ((x0, y0), (x1, y1)), color in lines], dtype="<i4").reshape(-1, 4)
+    palette_table = np.zeros((len(palette), 4), dtype=np.uint8)
+    for color, index in palette.items():
+        palette_table[index, :3] = color[:3]
+    return endpoints, color_indices, palette_table
+
+def write_binary(path, grid_size, cell_size, lines, revision=None):
+    """Write a drawing in the binary format, replacing the file atomically like write_json()"""
+    endpoints, color_indices, palette_table = lines_to_columns(lines)
+    if len(palette_table) > BINARY_MAX_COLORS:
+        raise DrawingFormatError(f"the binary format holds at most {BINARY_MAX_COLORS} colors, "
+                                 f"this drawing has {len(palette_table)}; save it as JSON")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, grid_size[0], grid_size[1], cell_size,
+                                   len(palette_table), len(endpoints), bytes.fromhex(revision) if revision else bytes(16)))
+        f.write(palette_table.tobytes())
+        f.write(endpoints.tobytes())
+        f.write(color_indices.astype("<u2").tobytes())
+    os.replace(temp_path, path)
+
+    # Edits journaled against the old file no longer apply
+    remove_journal(path)
+
+def is_binary(path):
+    """Check a file's magic bytes for the binary format"""
+    with open(path, "rb") as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def read_binary(path):
+    """
+    Map a binary drawing into arrays without creating per-line Python objects
+    Returns (save_data, endpoints, color_indices, palette): endpoints is an N x 4 int32 array,
+    color_indices an N uint16 array and palette a P x 4 uint8 array (r, g, b, unused).
+    The arrays are views of the memory-mapped file
+    """
+    import numpy as np
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < BINARY_HEADER.size:
+            raise DrawingFormatError(f"{path} is too short to be a drawing")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, flags, width, height, cell_size, palette_size, line_count, revision = \
+        BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise DrawingFormatError(f"{path} is not a binary drawing")
+    if version != BINARY_VERSION:
+        raise DrawingFormatError(f"{path} uses binary format version {version}, expected {BINARY_VERSION}")
+    expected_size = BINARY_HEADER.size + palette_size * 4 + line_count * 18
+    if len(data) < expected_size:
+        raise DrawingFormatError(f"{path} is truncated")
+
+    offset = BINARY_HEADER.size
+    palette = np.frombuffer(data, dtype=np.uint8, count=palette_size * 4, offset=offset).reshape(-1, 4)
+    offset += palette_size * 4
+    endpoints = np.frombuffer(data, dtype="<i4", count=line_count * 4, offset=offset).reshape(-1, 4)
+    offset += line_count * 16
+    color_indices = np.frombuffer(data, dtype="<u2", count=line_count, offset=offset)
+
+    save_data = {
+        "grid_size": [width, height],
+        "cell_size": cell_size,
+        "revision": revision.hex() if any(revision) else None,
+    }
+    return save_data, endpoints, color_indices, palette
+
+def read_drawing(path):
+    """Read a drawing in either format (detected by its magic bytes), returning (save_data, lines)"""
+    if not is_binary(path):
+        return read_json(path)
+    save_data, endpoints, color_indices, palette = read_binary(path)
+    colors = [tuple(color) for color in palette[:, :3].tolist()]
+    lines = [[((x0, y0), (x1, y1)), colors[index]]
+             for (x0, y0, x1, y1), index in zip(endpoints.tolist(), color_indices.tolist())]
+    return save_data, lines
+
+def read_columns(path):
+    """
+    Read a drawing in either format as arrays, returning (save_data, endpoints, color_indices, palette)
+    as read_binary() does (JSON drawings get uint32 color indices); binary files skip per-line Python objects entirely.
+    Journaled edits are not applied (see read_journal())
+    """
+    if is_binary(path):
+        return read_binary(path)
+    save_data, lines = read_json(path)
+    return (save_data,) + lines_to_columns(lines)
+
+def read_drawing_with_journal(path):
+    """
+    Read a drawing and replay the edits journaled after it, as the editor sees it
+    Returns (save_data, lines, edit_count)
+    """
+    save_data, lines = read_drawing(path)
+    edits = read_journal(path, save_data.get("revision"))
+    apply_journal(lines, edits)
+    return save_data, lines, len(edits)
+
+def write_drawing(path, grid_size, cell_size, lines, revision=None):
+    """Write a drawing, in the binary format if `path` ends in .sldr and as JSON otherwise"""
+    if path.endswith(BINARY_EXTENSION):
+        write_binary(path, grid_size, cell_size, lines, revision)
+    else:
+        write_json(path, grid_size, cell_size, lines, revision)
+
+# Journal: edits appended after a full save, one JSON object per line.
+# The first line names the revision of the file the edits apply to.
+
+def journal_path(path):
+    return path + ".journal"
+
+def append_journal(path, revision, edits):
+    """
+    Append edits to the journal of the drawing at `path`
+    Each edit is ("add", line, color) or ("erase", index)
+    """
+    journal = journal_path(path)
+    fresh = not os.path.exists(journal) or read_journal_revision(journal) != revision
+    with open(journal, "w" if fresh else "a") as f:
+        if fresh:
+            f.write(json.dumps({"revision": revision}) + "\n")
+        for edit in edits:
+            if edit[0] == "add":
+                f.write('{"op": "add", ' + format_line(edit[1], edit[2])[1:] + "\n")
+            else:
+                f.write(f'{{"op": "erase", "index": {edit[1]}}}\n')
+
+def read_journal_revision(journal):
+    with open(journal, "r") as f:
+        try:
+            return json.loads(f.readline()).get("revision")
+        except json.JSONDecodeError:
+            return None
+
+def read_journal(path, revision):
+    """Read the edits journaled against `revision`; an empty list if there are none"""
+    journal = journal_path(path)
+    if revision is None or not os.path.exists(journal) or read_journal_revision(journal) != revision:
+        return []
+    edits = []
+    with open(journal, "r") as f:
+        f.readline()
+        for text in f:
+            try:
+                edit = json.loads(text)
+            except json.JSONDecodeError:
+                # A save interrupted mid-line; everything before it is still good
+                break
+            if edit["op"] == "add":
+                edits.append(("add",) + tuple(parse_line(edit)))
+            else:
+                edits.append(("erase", edit["index"]))
+    return edits
+
+def apply_journal(lines, edits):
+    """Replay journaled edits onto a list of lines, in order"""
+    for edit in edits:
+        if edit[0] == "add":
+            lines.append([edit[1], edit[2]])
+        else:
+            lines.pop(edit[1])
+
+def remove_journal(path):
+    if os.path.exists(journal_path(path)):
+        os.remove(journal_path(path))
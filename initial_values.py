@@ -2,6 +2,9 @@
 # EARLAN JOSH Q. SABILLANO
 # JEA KATRINA G. JALANDONI
 
+GRID_LINE_MIN_CELL_PIXELS = 4  # Smaller cells would be all grid line, so the editor and PNG export leave the lines out
+
 class InitialValues:
     ZOOM_LEVEL = 1
-    CELL_SIZE = 50
\ No newline at end of file
+    CELL_SIZE = 50
+    ZOOM_LEVELS = (0.25, 0.5, 1, 2, 4)  # Cell size multipliers the view can zoom between
@@ -7,26 +7,41 @@ from pygame.locals import *
 import json
 import os
 import math
+import multiprocessing
+import threading
+
+import numpy as np
 
 # Import files
-from draw import Grid
+from draw import Grid, Canvas
+from sparse_canvas import SparseCanvas, EMPTY
 from bresenham_line import *
 from colors import *
 from toolbox import ToolBox
+from profiler import FrameProfiler
+from text_cache import text_cache
+import drawing_file
+import png_export
 
 class Screen:
     """A class to manage the pygame display globally with dirty rect handling"""
     _instance = None
     
+    # Past either limit one full-window update is cheaper than many small ones
+    MAX_DIRTY_RECTS = 64
+    MAX_DIRTY_AREA_RATIO = 0.5
+    
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Screen, cls).__new__(cls)
-            cls._instance.initialize()
         return cls._instance
     
     def initialize(self):
-        """Initialize the pygame display"""
-        pygame.init()
+        """
+        Initialize the pygame display (and nothing else, the mixer is never needed)
+        Called by init_display(), so importing main does not open a window
+        """
+        pygame.display.init()
         # Get the display info to decide on window size
         info = pygame.display.Info()
         # Set window to 80% of screen size for better visibility
@@ -36,6 +51,10 @@ class Screen:
         pygame.display.set_caption("Bresenham Line Drawing Tool")
         self.clock = pygame.time.Clock()
         self.dirty_rects = []
+        self.max_dirty_rects = self.MAX_DIRTY_RECTS
+        self.max_dirty_area_ratio = self.MAX_DIRTY_AREA_RATIO
+        # Statistics of the last update()
+        self.frame_stats = {"rects_submitted": 0, "rects_merged": 0, "pixels_updated": 0}
         
     def get_display(self):
         """Get the pygame display surface"""
@@ -45,9 +64,49 @@ class Screen:
         """Mark a rectangle as needing update"""
         self.dirty_rects.append(rect)
         
+    def coalesce_dirty_rects(self):
+        """Clip the dirty rects to the window and merge the ones that overlap or touch"""
+        window = self.display.get_rect()
+        merged = []
+        for rect in sorted(self.dirty_rects, key=lambda r: (r[1], r[0])):
+            rect = pygame.Rect(rect).clip(window)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            # Growing by one pixel on each side makes touching rects collide too
+            i = rect.inflate(2, 2).collidelist(merged)
+            while i != -1:
+                rect.union_ip(merged.pop(i))
+                i = rect.inflate(2, 2).collidelist(merged)
+            merged.append(rect)
+        return merged
+        
     def update(self):
         """Update only the dirty parts of the screen"""
-        pygame.display.update(self.dirty_rects)
+        submitted = len(self.dirty_rects)
+        window = self.display.get_rect()
+        window_area = self.width * self.height
+        area_limit = window_area * self.max_dirty_area_ratio
+        
+        # Merging costs about the square of the rect count, so check the cheap limits first:
+        # too many rects, or a single rect already past the area limit
+        clipped = (pygame.Rect(rect).clip(window) for rect in self.dirty_rects)
+        full = submitted > self.max_dirty_rects or any(rect.width * rect.height > area_limit for rect in clipped)
+        rects = []
+        if not full:
+            rects = self.coalesce_dirty_rects()
+            pixels = sum(rect.width * rect.height for rect in rects)
+            full = len(rects) > self.max_dirty_rects or pixels > area_limit
+        
+        if full:
+            # Too much changed, flip the whole window instead
+            pygame.display.update()
+            pixels = window_area
+        elif rects:
+            pygame.display.update(rects)
+        
+        # rects_merged stays 0 when a full update made merging unnecessary
+        self.frame_stats = {"rects_submitted": submitted, "rects_merged": len(rects) if not full else 0,
+                            "pixels_updated": pixels}
         self.dirty_rects = []
         
     def fill(self, color, rect=None):
@@ -70,6 +129,7 @@ class Screen:
             
     def draw_rect(self, color, rect, width=0):
         """Draw a rectangle and mark it as dirty"""
+        profiler.count("draw_rect")
         pygame.draw.rect(self.display, color, rect, width)
         self.mark_dirty(rect)
         
@@ -86,10 +146,137 @@ class Screen:
         rect_height = max(rect_height, 1)
         self.mark_dirty(pygame.Rect(x, y, rect_width, rect_height))
 
-# Initialize the global screen
+class CellIndex:
+    """
+    Maps each grid cell to the IDs of the lines covering it
+    The cells of a whole drawing sit in two sorted NumPy arrays, a cell key and a line ID per
+    covered cell (16 bytes each). Lines drawn since then wait in a small dict and erased lines
+    in a set, until there are enough of either to merge them into the arrays
+    """
+    MERGE_MIN = 65536  # Cells drawn or lines erased before the arrays are rebuilt
+
+    def __init__(self):
+        self.keys = np.zeros(0, dtype=np.int64)  # cell_key() of every covered cell, sorted
+        self.ids = np.zeros(0, dtype=np.int64)  # Line covering each of them, ascending per cell
+        self.last_merged_id = -1  # Lines up to this ID are in the arrays
+        self.added = {}  # (x, y) -> set of IDs of lines drawn since the last merge
+        self.added_cells = 0
+        self.erased = set()  # IDs of erased lines still in the arrays
+
+    @staticmethod
+    def cell_key(x, y):
+        """One int64 per cell, for plain ints or NumPy arrays"""
+        return (x << 32) | (y & 0xFFFFFFFF)
+
+    def add(self, line_id, points):
+        """Register the cells of a newly drawn line"""
+        for point in points:
+            owners = self.added.get(point)
+            if owners is None:
+                self.added[point] = {line_id}
+            else:
+                owners.add(line_id)
+        self.added_cells += len(points)
+        if self.added_cells > max(self.MERGE_MIN, len(self.keys)):
+            self.merge()
+
+    def remove(self, line_id, points):
+        """Unregister the cells of a line"""
+        if line_id <= self.last_merged_id:
+            self.erased.add(line_id)
+            if len(self.erased) > self.MERGE_MIN:
+                self.merge()
+            return
+        for point in points:
+            owners = self.added.get(point)
+            if owners is not None:
+                owners.discard(line_id)
+                if not owners:
+                    del self.added[point]
+
+    def rebuild(self, xs, ys, cell_ids):
+        """Rebuild the whole index from arrays of every covered cell and the ID of the line covering it"""
+        keys = self.cell_key(np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64))
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        order = np.lexsort((cell_ids, keys))
+        self.keys, self.ids = keys[order], cell_ids[order]
+        self.last_merged_id = int(cell_ids.max()) if len(cell_ids) else -1
+        self.added = {}
+        self.added_cells = 0
+        self.erased = set()
+
+    def merge(self):
+        """Fold the lines drawn and erased since the last merge into the arrays"""
+        keep = ~np.isin(self.ids, np.fromiter(self.erased, dtype=np.int64, count=len(self.erased)))
+        xs, ys, cell_ids = [], [], []
+        for (x, y), owners in self.added.items():
+            for line_id in owners:
+                xs.append(x)
+                ys.append(y)
+                cell_ids.append(line_id)
+        keys = np.concatenate([self.keys[keep], self.cell_key(np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64))])
+        cell_ids = np.concatenate([self.ids[keep], np.array(cell_ids, dtype=np.int64)])
+        last_merged_id = max(self.last_merged_id, int(cell_ids.max()) if len(cell_ids) else -1)
+        order = np.lexsort((cell_ids, keys))
+        self.keys, self.ids = keys[order], cell_ids[order]
+        self.last_merged_id = last_merged_id
+        self.added = {}
+        self.added_cells = 0
+        self.erased = set()
+
+    def lines_at(self, point):
+        """Get the IDs of the lines covering `point`, in drawing order"""
+        key = self.cell_key(*point)
+        start = int(np.searchsorted(self.keys, key))
+        end = int(np.searchsorted(self.keys, key, side="right"))
+        owners = [line_id for line_id in self.ids[start:end].tolist() if line_id not in self.erased]
+        added = self.added.get(point)
+        if added:
+            owners += sorted(added)
+        return owners
+
+    def first_line_at(self, point):
+        """Get the ID of the first drawn line covering `point`, or -1"""
+        owners = self.lines_at(point)
+        return owners[0] if owners else -1
+
+    def top_line_at(self, point):
+        """Get the ID of the line drawn on top at `point` (the latest one), or -1"""
+        owners = self.lines_at(point)
+        return owners[-1] if owners else -1
+
+class FileJob:
+    """Runs a file write in a background thread so the editor keeps drawing frames"""
+
+    def __init__(self, write):
+        self.message = None  # Feedback text returned by `write(job)`
+        self.error = None
+        self.progress = 0.0  # Fraction done, for writes that report it
+        self.thread = threading.Thread(target=self.run, args=(write,))
+        self.thread.start()
+
+    def run(self, write):
+        try:
+            self.message = write(self)
+        except Exception as e:
+            # Anything else would end the thread silently; report it like a file error
+            self.error = e
+
+    def report_progress(self, fraction):
+        self.progress = fraction
+
+    def done(self):
+        return not self.thread.is_alive()
+
+# Frame profiler, off unless SIMPLELINE_PROFILE=1 or toggled with F3.
+# SIMPLELINE_PROFILE_DUMP=<file> also appends every profiled frame to a JSON lines file
+profiler = FrameProfiler(enabled=os.environ.get("SIMPLELINE_PROFILE") == "1",
+                         dump_path=os.environ.get("SIMPLELINE_PROFILE_DUMP"))
+
+# The global screen, its window opens on first use (see init_display)
 screen_manager = Screen()
-screen = screen_manager.get_display()
-clock = screen_manager.clock
+screen = None
+clock = None
 
 # STATES
 STATE_START_SCREEN = "start_screen"
@@ -106,6 +293,15 @@ MODE_ERASE = "erase"  # Erasing lines
 # UI Constants
 TOOLBAR_HEIGHT = 50  # Height of the toolbar
 
+# Arrow keys pan the view by a quarter of it in their direction
+PAN_KEYS = {K_LEFT: (-1, 0), K_RIGHT: (1, 0), K_UP: (0, -1), K_DOWN: (0, 1)}
+ZOOM_IN_KEYS = (K_PLUS, K_EQUALS, K_KP_PLUS)
+ZOOM_OUT_KEYS = (K_MINUS, K_KP_MINUS)
+
+# Grid size limits, in cells. Only drawn cells take memory (see SparseCanvas)
+MIN_GRID_SIZE = 5
+MAX_GRID_SIZE = 100000
+
 # Program states and variables
 current_state = STATE_START_SCREEN
 current_mode = MODE_PEN  # Default mode is pen
@@ -115,14 +311,50 @@ program_data = {
     "grid_height": 10
 }
 
+# Line shapes whose cells are kept for reuse at any position; SIMPLELINE_PATTERN_CACHE=0 turns that off
+pattern_cache.resize(int(os.environ.get("SIMPLELINE_PATTERN_CACHE", PATTERN_CACHE_SIZE)))
+
+# Save file
+DRAWING_FILE = "drawing.json"
+# With SIMPLELINE_SAVE_JOURNAL=1, saves after the first one only append the new edits to drawing.json.journal
+SAVE_JOURNAL = os.environ.get("SIMPLELINE_SAVE_JOURNAL") == "1"
+JOURNAL_MIN_EDITS = 1000  # The journal is folded into a full save once it has more edits than this and the line count
+save_job = None  # The save running in the background, if any
+pending_edits = []  # Edits since the last save, for journal saves
+journal_revision = None  # Revision of the saved file the journal applies to; None forces a full save
+journal_edit_count = 0
+
+# Export
+EXPORT_FILE = "drawing.png"
+export_job = None  # The export running in the background, if any
+export_progress_shown = -1  # Last progress percentage put in the toolbar
+
 # Feedback message variables
 feedback_message = ""
 feedback_color = COLOR_WHITE
 feedback_timer = 0  # Timer for auto-hiding feedback
 
-# Font setup
-font = pygame.font.SysFont("Arial", 18)
-title_font = pygame.font.SysFont("Arial", 24, bold=True)
+# Fonts, loaded with the window
+font = None
+title_font = None
+names_font = None
+
+def init_display():
+    """
+    Open the window and load the fonts, once
+    Runs on first use rather than on import, so importing main stays cheap
+    """
+    global screen, clock, font, title_font, names_font
+    if screen is not None:
+        return
+    screen_manager.initialize()
+    screen = screen_manager.get_display()
+    clock = screen_manager.clock
+    pygame.font.init()
+    font = pygame.font.SysFont("Arial", 18)
+    title_font = pygame.font.SysFont("Arial", 24, bold=True)
+    # Comic Sans MS for the rainbow names
+    names_font = pygame.font.SysFont("Comic Sans MS", 18)
 
 # Settings input fields
 SETTING_NONE = 0
@@ -133,32 +365,98 @@ active_setting = SETTING_NONE
 input_text = ""
 
 # Initialize objects
-bresenham_points = BresenhamPoints()
+cell_index = CellIndex()
 toolbox = ToolBox()
 grid = None  # Will be initialized after start screen
+canvas = None  # Offscreen copy of the visible committed lines, created with the grid
+cells = SparseCanvas(program_data["grid_width"], program_data["grid_height"])  # Top line of every drawn cell
 
 # Line drawing variables
 first_point = None
 preview_point = None
-last_preview_line = []  # Store the last preview line for cleanup
+last_preview_line = []  # Spans of the last preview line, for cleanup
+last_preview_ends = None  # Its (x0, y0, x1, y1), or None when no preview is shown
 active_color = COLOR_WHITE
-lines = []  # Store lines as [(start_point, end_point), color]
-active_line_index = -1  # Index of highlighted line
+lines = BresenhamPoints()  # The committed lines, by ID in drawing order
+active_line_id = -1  # ID of the highlighted line
+# Mouse motion events seen, and how many were dropped for a later one in the same frame
+input_stats = {"motion_received": 0, "motion_coalesced": 0}
+
+def cell_color(point):
+    """Get the color a committed cell is shown with, or None if no line covers it"""
+    return line_color(cells.get(point))
+
+def line_color(line_id):
+    """Get the color a line is shown with, or None for EMPTY"""
+    if line_id == EMPTY:
+        return None
+    return COLOR_GREY if line_id == active_line_id else lines.color(line_id)
+
+def line_cells(line):
+    """
+    Get the cells of a committed line
+    They are not kept per line; lines of the same shape come from the bounded pattern cache
+    """
+    (x0, y0), (x1, y1) = line
+    profiler.count("bresenham_line_cached")  # Lookups, pattern hits included
+    return bresenham_line_cached(x0, y0, x1, y1)
+
+def cells_in_view(line):
+    """Get the runs of cells of a line that are in view, without walking the rest of it"""
+    (x0, y0), (x1, y1) = line
+    profiler.count("bresenham_spans")
+    return bresenham_spans(x0, y0, x1, y1, canvas.visible_cells())
+
+def commit_line(line, color):
+    """Add a finished line to the drawing"""
+    line_id = lines.add(line, color)
+    if SAVE_JOURNAL:
+        pending_edits.append(("add", line, color))
+    points = line_cells(line)
+    cell_index.add(line_id, points)
+    cells.paint(points, line_id)
+    canvas.repaint(cells_in_view(line), cell_color)
+
+def erase_line(line_id):
+    """Remove a line from the drawing; the other lines keep their IDs"""
+    if SAVE_JOURNAL:
+        # Saved files count lines by position
+        pending_edits.append(("erase", lines.position(line_id)))
+    line, color = lines.erase(line_id)
+    points = line_cells(line)
+    cell_index.remove(line_id, points)
+    # The erased line's cells show whatever line is left on top
+    for point in points:
+        cells.set(point, cell_index.top_line_at(point))
+    cells.release_empty()
+    canvas.repaint(cells_in_view(line), cell_color)
+
+def set_active_line(line_id):
+    """Highlight another line, or none with -1"""
+    global active_line_id
+    previous = active_line_id
+    active_line_id = line_id
+    for i in (previous, line_id):
+        if i in lines:
+            canvas.repaint(cells_in_view(lines.line(i)), cell_color)
 
 def render_text(text, font, color, surface, x, y):
-    """Helper function to render text"""
-    text_surface = font.render(text, True, color)
+    """Helper function to render text; labels already rendered come from the text cache"""
+    misses = text_cache.misses
+    text_surface = text_cache.render(font, text, color)
+    if text_cache.misses != misses:
+        profiler.count("text_render")
     text_rect = text_surface.get_rect()
     text_rect.topleft = (x, y)
     surface.blit(text_surface, text_rect)
     screen_manager.mark_dirty(text_rect)  # Mark the text rect as dirty
+    return text_rect
 
 def draw_start_screen():
     """Draw the configuration screen, centered, with animated rainbow names."""
     global active_setting, input_text
 
-    # Comic Sans MS for the rainbow names
-    cs_font = pygame.font.SysFont("Comic Sans MS", 18)
+    cs_font = names_font
 
     screen_manager.fill(COLOR_BLACK)
 
@@ -190,8 +488,8 @@ def draw_start_screen():
         x_pos = cx - cs_font.size(name)[0] // 2
         for i, ch in enumerate(name):
             color = RAINBOW[(i + offset) % len(RAINBOW)]
-            render_text(ch, cs_font, color, screen, x_pos, y_name)
-            x_pos += cs_font.size(ch)[0]
+            # Each letter's width comes with its cached surface
+            x_pos += render_text(ch, cs_font, color, screen, x_pos, y_name).width
 
     # "New Drawing" label - placed below the last name with extra space
     nd = "New Drawing. Click, type, and [press enter] to edit and confirm changes."
@@ -224,7 +522,7 @@ def draw_start_screen():
     render_text(display_text, font, COLOR_WHITE, screen, input_x + 5, y)
     render_text("(10-100)", font, COLOR_WHITE, screen, limits_x, y)
 
-    # Grid Width (5-200)
+    # Grid Width (MIN_GRID_SIZE-MAX_GRID_SIZE)
     y += row_h
     render_text("Grid Width", font, COLOR_WHITE, screen, label_x, y)
     grid_width_rect = pygame.Rect(input_x, y, textbox_width, 20)
@@ -237,9 +535,9 @@ def draw_start_screen():
     else:
         display_text = str(program_data["grid_width"])
     render_text(display_text, font, COLOR_WHITE, screen, input_x + 5, y)
-    render_text("(5-200)", font, COLOR_WHITE, screen, limits_x, y)
+    render_text(f"({MIN_GRID_SIZE}-{MAX_GRID_SIZE})", font, COLOR_WHITE, screen, limits_x, y)
 
-    # Grid Height (5-200)
+    # Grid Height (MIN_GRID_SIZE-MAX_GRID_SIZE)
     y += row_h
     render_text("Grid Height", font, COLOR_WHITE, screen, label_x, y)
     grid_height_rect = pygame.Rect(input_x, y, textbox_width, 20)
@@ -252,7 +550,7 @@ def draw_start_screen():
     else:
         display_text = str(program_data["grid_height"])
     render_text(display_text, font, COLOR_WHITE, screen, input_x + 5, y)
-    render_text("(5-200)", font, COLOR_WHITE, screen, limits_x, y)
+    render_text(f"({MIN_GRID_SIZE}-{MAX_GRID_SIZE})", font, COLOR_WHITE, screen, limits_x, y)
 
     # Start & Load buttons
     bw, bh = 140, 40
@@ -278,6 +576,8 @@ def draw_toolbar():
     """Draw the toolbar with color selector and options"""
     global current_mode, feedback_message, feedback_color, feedback_timer
     
+    init_display()
+    
     # Make toolbar span entire window width
     toolbar_rect = pygame.Rect(0, 0, screen_manager.width, TOOLBAR_HEIGHT)
     screen_manager.draw_rect((50, 50, 50), toolbar_rect)
@@ -328,7 +628,7 @@ def draw_toolbar():
     render_text(mode_text, font, COLOR_WHITE, screen, screen_manager.width - 300, 15)
     
     # Cell size indicator (right-aligned)
-    cell_size_text = f"Cell Size: {program_data['grid_cell_size']}px"
+    cell_size_text = f"Cell Size: {grid.cell_size if grid else program_data['grid_cell_size']}px"
     render_text(cell_size_text, font, COLOR_WHITE, screen, screen_manager.width - 160, 15)
     
     return color_rect, pen_rect, eraser_rect, save_rect, export_rect
@@ -358,37 +658,66 @@ def draw_color_selector():
     
     return color_rects, cancel_button
 
-def save_drawing():
-    """Save the drawing as JSON"""
-    save_data = {
-        "grid_size": (program_data["grid_width"], program_data["grid_height"]),
-        "cell_size": program_data["grid_cell_size"],
-        "lines": []
-    }
-    
-    for line, color in lines:
-        save_data["lines"].append({
-            "start": line[0],
-            "end": line[1],
-            "color": color
-        })
-    
-    # Save to file
-    with open('drawing.json', 'w') as f:
-        json.dump(save_data, f)
+def save_drawing(path=DRAWING_FILE):
+    """
+    Save the drawing in the background, as JSON written one line at a time
+    or in the binary format if `path` ends in .sldr
+    """
+    global save_job, pending_edits, journal_revision, journal_edit_count
+    
+    if save_job is not None:
+        show_feedback("Still saving, try again in a moment", COLOR_YELLOW, 2000)
+        return True
+    
+    edits, pending_edits = pending_edits, []
+    if SAVE_JOURNAL and journal_revision is not None and \
+            journal_edit_count + len(edits) <= max(JOURNAL_MIN_EDITS, len(lines)):
+        # Only append what changed since the last save
+        revision = journal_revision
+        journal_edit_count += len(edits)
+        
+        def write(job):
+            drawing_file.append_journal(path, revision, edits)
+            return f"Saved {len(edits)} edits to: {path}"
+    else:
+        # The background thread works from a snapshot, so the editor can keep changing `lines`
+        snapshot = lines.copy()
+        grid_size = (program_data["grid_width"], program_data["grid_height"])
+        cell_size = program_data["grid_cell_size"]
+        revision = drawing_file.new_revision()
+        journal_revision = revision if SAVE_JOURNAL else None
+        journal_edit_count = 0
+        
+        def write(job):
+            drawing_file.write_drawing(path, grid_size, cell_size, snapshot, revision)
+            return f"File saved as: {path}"
+    
+    save_job = FileJob(write)
     
     # Show feedback in the toolbar instead of a dialog
-    show_feedback("File saved as: drawing.json", COLOR_GREEN, 3000)
+    show_feedback("Saving...", COLOR_WHITE, 60000)
     
     return True
 
-def load_drawing():
-    """Load a drawing from a JSON file"""
-    global program_data, lines, grid
+def finish_save():
+    """Report a finished background save"""
+    global save_job, journal_revision
+    
+    if save_job.error is not None:
+        # The file on disk is whatever the last good save left, so write everything next time
+        journal_revision = None
+        show_feedback(f"Error saving file: {save_job.error}", COLOR_RED, 3000)
+    else:
+        show_feedback(save_job.message, COLOR_GREEN, 3000)
+    save_job = None
+
+def load_drawing(path=DRAWING_FILE):
+    """Load a drawing from a JSON or binary file"""
+    global program_data, lines, grid, pending_edits, journal_revision, journal_edit_count, active_line_id
     
     try:
-        with open('drawing.json', 'r') as f:
-            save_data = json.load(f)
+        save_data, endpoints, color_indices, palette = drawing_file.read_columns(path)
+        edits = drawing_file.read_journal(path, save_data.get("revision"))
         
         # Update program data
         if "grid_size" in save_data:
@@ -397,201 +726,209 @@ def load_drawing():
         if "cell_size" in save_data:
             program_data["grid_cell_size"] = save_data["cell_size"]
         
-        # Clear existing lines and load saved lines
-        lines = []
-        for line_data in save_data["lines"]:
-            # Handle different formats of start/end coordinates
-            # If start/end are arrays like [x, y]
-            if isinstance(line_data["start"], list):
-                start = (line_data["start"][0], line_data["start"][1])
-            # If start/end are objects like {"x": x, "y": y}
-            else:
-                start = (line_data["start"]["x"], line_data["start"]["y"])
-                
-            if isinstance(line_data["end"], list):
-                end = (line_data["end"][0], line_data["end"][1])
+        # Replace existing lines with the saved lines and any journaled edits made after them
+        lines = BresenhamPoints.from_columns(endpoints, color_indices, palette[:, :3].tolist())
+        for edit in edits:
+            if edit[0] == "add":
+                lines.add(edit[1], edit[2])
             else:
-                end = (line_data["end"]["x"], line_data["end"]["y"])
-                
-            # Handle different color formats (tuple, list, hex string)
-            color = line_data["color"]
-            if isinstance(color, str) and color.startswith("#"):
-                # Convert hex color to RGB tuple
-                r = int(color[1:3], 16)
-                g = int(color[3:5], 16)
-                b = int(color[5:7], 16)
-                color = (r, g, b)
-            elif isinstance(color, list):
-                # Convert list to tuple
-                color = tuple(color)
-                
-            lines.append([(start, end), color])
+                lines.erase(lines.id_at(edit[1]))
+        active_line_id = -1
+        pending_edits = []
+        journal_revision = save_data.get("revision") if SAVE_JOURNAL else None
+        journal_edit_count = len(edits)
         
-        # Initialize the grid with the loaded settings
+        # Initialize the grid with the loaded settings, which also indexes the loaded lines
         init_grid()
         
         # Show feedback in the toolbar instead of a dialog
         show_feedback("Drawing loaded successfully!", COLOR_GREEN, 3000)
         return True
         
-    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
-        # Show error feedback in the toolbar
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, IndexError, ValueError, OverflowError) as e:
+        # Show error feedback in the toolbar (bad values, such as a two-number color, are ValueErrors too;
+        # coordinates too big for the line store are OverflowErrors)
         show_feedback(f"Error loading file: {str(e)}", COLOR_RED, 3000)
         return False
 
-def export_as_png():
-    """Export the drawing as PNG"""
-    # Save the screen region containing just the grid
-    grid_surface = pygame.Surface((
-        program_data["grid_width"] * program_data["grid_cell_size"],
-        program_data["grid_height"] * program_data["grid_cell_size"]
-    ))
-    grid_surface.fill(COLOR_BLACK)
-    
-    # Redraw the grid on the new surface
-    for line, color in lines:
-        points = bresenham_line(line[0][0], line[0][1], line[1][0], line[1][1])
-        for point in points:
-            x, y = point
-            pygame.draw.rect(grid_surface, color, 
-                pygame.Rect(x * program_data["grid_cell_size"], 
-                           y * program_data["grid_cell_size"], 
-                           program_data["grid_cell_size"], 
-                           program_data["grid_cell_size"]))
-    
-    # Draw grid lines
-    for x in range(0, program_data["grid_width"] + 1):
-        pygame.draw.line(grid_surface, COLOR_GREY, 
-                        (x * program_data["grid_cell_size"], 0), 
-                        (x * program_data["grid_cell_size"], program_data["grid_height"] * program_data["grid_cell_size"]))
-    for y in range(0, program_data["grid_height"] + 1):
-        pygame.draw.line(grid_surface, COLOR_GREY, 
-                        (0, y * program_data["grid_cell_size"]), 
-                        (program_data["grid_width"] * program_data["grid_cell_size"], y * program_data["grid_cell_size"]))
-    
-    # Save the image
-    pygame.image.save(grid_surface, "drawing.png")
-    
-    # Show feedback in the toolbar instead of dialog
-    show_feedback("File exported as: drawing.png", COLOR_GREEN, 3000)
+def export_as_png(path=EXPORT_FILE, scale=1.0):
+    """
+    Export the drawing as PNG in the background, rendered in horizontal tiles
+    `scale` multiplies the cell size; the image always gets at least 1 pixel per cell
+    """
+    global export_job, export_progress_shown
+    
+    if export_job is not None:
+        show_feedback("Still exporting, try again in a moment", COLOR_YELLOW, 2000)
+        return True
+    
+    # The background thread works from a snapshot, so the editor can keep drawing
+    snapshot = cells.copy()
+    line_colors = lines.color_table()  # Cells hold line IDs
+    cell_pixels = max(1, round(program_data["grid_cell_size"] * scale))
+    
+    def write(job):
+        png_export.export_cells(path, snapshot, line_colors, cell_pixels, job.report_progress)
+        return f"File exported as: {path}"
+    
+    export_job = FileJob(write)
+    export_progress_shown = -1
     
     return True
 
-def init_grid():
-    """Initialize the grid with the current settings"""
-    global grid
+def update_export_progress():
+    """Show how far the background export got, or its result once it is done"""
+    global export_job, export_progress_shown
     
-    # Adjust grid dimensions to fit the screen if needed
-    max_width = (screen_manager.width) // program_data["grid_cell_size"]
-    max_height = (screen_manager.height - TOOLBAR_HEIGHT) // program_data["grid_cell_size"]
+    if export_job.done():
+        if export_job.error is not None:
+            show_feedback(f"Error exporting file: {export_job.error}", COLOR_RED, 3000)
+        else:
+            show_feedback(export_job.message, COLOR_GREEN, 3000)
+        export_job = None
+        return
     
-    # Enforce limits on grid dimensions to fit screen
-    if program_data["grid_width"] > max_width:
-        program_data["grid_width"] = max_width
+    percent = int(export_job.progress * 100)
+    if percent != export_progress_shown:
+        export_progress_shown = percent
+        show_feedback(f"Exporting... {percent}%", COLOR_WHITE, 60000)
+
+def load_cells():
+    """
+    Rasterize every committed line in one batch into the sparse canvas and the cell index
+    Only the batch's flat arrays are built, no per-line lists of cells. Drawings of more than
+    PARALLEL_MIN_CELLS cells are rasterized on every core (see freeze_support() under __main__)
+    """
+    line_ids, endpoints = lines.columns()
+    profiler.count("bresenham_line_batch", len(line_ids))  # Lines, not calls
+    xs, ys, offsets = bresenham_line_batch_parallel(endpoints)
+    cell_ids = np.repeat(line_ids, np.diff(offsets))
+    cells.load(xs, ys, cell_ids)
+    cell_index.rebuild(xs, ys, cell_ids)
+
+def init_grid():
+    """Initialize the grid with the current settings"""
+    global grid, canvas, cells
     
-    if program_data["grid_height"] > max_height:
-        program_data["grid_height"] = max_height
+    init_display()
     
-    grid = Grid(screen)
-    grid.cell_size = program_data["grid_cell_size"]
+    # The grid can be far bigger than the window, only the part in view is drawn
+    width, height = program_data["grid_width"], program_data["grid_height"]
+    view_width, view_height = view_size(program_data["grid_cell_size"])
     
-    # Create empty 2D array based on grid dimensions
-    grid.cells = []
-    for x in range(program_data["grid_width"]):
-        grid.cells.append([])
-        for y in range(program_data["grid_height"]):
-            grid.cells[x].append(0)
+    # Creates the empty cell array for the visible part of the grid
+    grid = Grid(screen, view_width, view_height, program_data["grid_cell_size"])
     
-    # Always use thin lines for grid
-    line_thickness = 1
+    # Which line is on top of each drawn cell, for the whole grid
+    cells = SparseCanvas(width, height)
+    load_cells()
         
     # Replace the original draw_grid method with a custom one
     def custom_draw_grid():
         # Fill the background
         screen.fill(COLOR_BLACK)
         
-        # Draw the grid cells - offset by TOOLBAR_HEIGHT
-        for x in range(0, program_data["grid_width"]):
-            for y in range(0, program_data["grid_height"]):
-                pygame.draw.rect(screen, COLOR_WHITE, 
-                    pygame.Rect(x*grid.cell_size, y*grid.cell_size + TOOLBAR_HEIGHT, 
-                              grid.cell_size, grid.cell_size), line_thickness)
+        # Paint the visible drawn cells onto the canvas
+        canvas.redraw((span, line_color(i)) for span, i in cells.drawn_spans(*canvas.visible_cells()))
         
-        # Mark the entire grid area as dirty
-        grid_area = pygame.Rect(0, TOOLBAR_HEIGHT, 
-                           program_data["grid_width"] * grid.cell_size,
-                           program_data["grid_height"] * grid.cell_size)
-        screen_manager.mark_dirty(grid_area)
+        # Copy the whole canvas below the toolbar
+        canvas.blit_to(screen_manager, 0, TOOLBAR_HEIGHT)
         
         return True
     
     # Replace the original method
     grid.draw_grid = custom_draw_grid
+    apply_view()
+
+def view_size(cell_size):
+    """Get how many cells of the grid fit below the toolbar at `cell_size`"""
+    return (min(program_data["grid_width"], screen_manager.width // cell_size),
+            min(program_data["grid_height"], (screen_manager.height - TOOLBAR_HEIGHT) // cell_size))
+
+def apply_view():
+    """
+    Show the part of the grid the grid's pan and zoom settings ask for
+    Only the cells in view are painted, however big the drawing is
+    """
+    global canvas
+    
+    # The preview was painted for the old view
+    clean_preview_line()
+    
+    view_width, view_height = view_size(grid.cell_size)
+    # Keep the view on the grid
+    grid.move((max(0, min(grid.x_map_displacement, program_data["grid_width"] - view_width)),
+               max(0, min(grid.y_map_displacement, program_data["grid_height"] - view_height))))
+    
+    canvas = Canvas(view_width, view_height, grid.cell_size, (grid.x_map_displacement, grid.y_map_displacement))
     grid.draw_grid()
 
+def pan_view(dx, dy):
+    """Scroll the view by (dx, dy) cells"""
+    grid.move((grid.x_map_displacement + dx, grid.y_map_displacement + dy))
+    apply_view()
+
+def zoom_view(steps, anchor):
+    """Zoom in (positive steps) or out through ZOOM_LEVELS, keeping the cell under `anchor` in place"""
+    zoom_level = grid.zoom_step(steps)
+    if zoom_level == grid.zoom_level:
+        return
+    
+    # The point under the anchor, in cells (not rounded)
+    anchor_x, anchor_y = anchor[0], max(0, anchor[1] - TOOLBAR_HEIGHT)
+    cell_x = grid.x_map_displacement + anchor_x / grid.cell_size
+    cell_y = grid.y_map_displacement + anchor_y / grid.cell_size
+    
+    grid.zoom(zoom_level)
+    grid.move((math.floor(cell_x - anchor_x / grid.cell_size), math.floor(cell_y - anchor_y / grid.cell_size)))
+    apply_view()
+
 def clean_preview_line():
     """Clean up the previous preview line by redrawing the cells with their original color"""
-    global last_preview_line, grid
+    global last_preview_line, last_preview_ends, grid
     
     # Check if grid exists and if there are points to clean
     if not last_preview_line or grid is None:
+        last_preview_ends = None
         return
         
-    for point in last_preview_line:
-        x, y = point
-        if 0 <= x < program_data["grid_width"] and 0 <= y < program_data["grid_height"]:
-            # Redraw cell with background color - with toolbar offset
-            cell_rect = pygame.Rect(x * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT, 
-                                  grid.cell_size, grid.cell_size)
-            screen_manager.draw_rect(COLOR_BLACK, cell_rect)
-            
-            # Check if this cell is part of any existing line
-            for i, (line, color) in enumerate(lines):
-                line_points = bresenham_line(line[0][0], line[0][1], line[1][0], line[1][1])
-                if point in line_points:
-                    # Redraw the cell with the appropriate color
-                    line_color = COLOR_GREY if i == active_line_index else color
-                    screen_manager.draw_rect(line_color, cell_rect)
-                    break
-            
-    # Also mark the grid lines as dirty for the affected cells
-    for point in last_preview_line:
-        x, y = point
-        if 0 <= x < program_data["grid_width"] and 0 <= y < program_data["grid_height"]:
-            # Redraw grid lines for this cell - with toolbar offset
-            screen_manager.draw_line(COLOR_GREY, 
-                                   (x * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT), 
-                                   ((x+1) * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT))
-            screen_manager.draw_line(COLOR_GREY, 
-                                   (x * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT), 
-                                   (x * grid.cell_size, (y+1) * grid.cell_size + TOOLBAR_HEIGHT))
-            screen_manager.draw_line(COLOR_GREY, 
-                                   ((x+1) * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT), 
-                                   ((x+1) * grid.cell_size, (y+1) * grid.cell_size + TOOLBAR_HEIGHT))
-            screen_manager.draw_line(COLOR_GREY, 
-                                   (x * grid.cell_size, (y+1) * grid.cell_size + TOOLBAR_HEIGHT), 
-                                   ((x+1) * grid.cell_size, (y+1) * grid.cell_size + TOOLBAR_HEIGHT))
+    # Copy the committed drawing (cells and grid lines) back over the preview cells
+    canvas.restore(screen_manager, last_preview_line, 0, TOOLBAR_HEIGHT)
     
     last_preview_line = []
+    last_preview_ends = None
 
 def draw_preview_line(start_point, end_point):
-    """Draw a preview line between two grid points and store it for later cleanup"""
-    global last_preview_line
+    """
+    Draw a preview line between two grid points and store it for later cleanup
+    Only cells that differ from the previous preview get repainted
+    """
+    global last_preview_line, last_preview_ends
     
-    # First clean up the previous preview line
-    clean_preview_line()
+    # Calculate the part of the new preview line that is in view
+    preview_line = cells_in_view((start_point, end_point))
+    new_ends = (*start_point, *end_point)
     
-    # Calculate and draw the new preview line
-    preview_line = bresenham_line(start_point[0], start_point[1], end_point[0], end_point[1])
-    for point in preview_line:
-        x, y = point
-        if 0 <= x < program_data["grid_width"] and 0 <= y < program_data["grid_height"]:
-            cell_rect = pygame.Rect(x * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT,
-                                  grid.cell_size, grid.cell_size)
-            screen_manager.draw_rect((100, 100, 100), cell_rect)
+    # Cells the preview left show the committed drawing again
+    canvas.restore(screen_manager, split_spans(last_preview_line, lambda point: not line_covers_cell(*new_ends, *point)),
+                   0, TOOLBAR_HEIGHT)
+    
+    # Paint only the cells the preview reached, a rect per run (both lines are clipped to the same view)
+    if last_preview_ends is None:
+        added = preview_line
+    else:
+        added = split_spans(preview_line, lambda point: not line_covers_cell(*last_preview_ends, *point))
+    for span in added:
+        screen_manager.draw_rect((100, 100, 100), canvas.span_rect(span).move(0, TOOLBAR_HEIGHT))
+    
+    # Keep the cell boundaries visible on top of the preview
+    grid_start = profiler.clock()
+    canvas.draw_grid_lines_over(screen_manager, added, 0, TOOLBAR_HEIGHT)
+    profiler.add_time("grid", grid_start)
     
     # Store this preview line for future cleanup
     last_preview_line = preview_line
+    last_preview_ends = new_ends
 
 def find_line_at_point(mouse_pos):
         """Find if a line exists at the given mouse position"""
@@ -600,16 +937,12 @@ def find_line_at_point(mouse_pos):
         
         # Only convert if the mouse is in the grid area
         if adjusted_y >= 0:
-            grid_x = math.floor(mouse_pos[0]/grid.cell_size)
-            grid_y = math.floor(adjusted_y/grid.cell_size)
+            grid_x, grid_y = grid.convert_world_coordinates_to_grid_coordinates(mouse_pos[0], adjusted_y)
             point = (grid_x, grid_y)
             
-            # Check if point is within grid bounds
-            if 0 <= grid_x < program_data["grid_width"] and 0 <= grid_y < program_data["grid_height"]:
-                for i, (line, color) in enumerate(lines):
-                    line_points = bresenham_line(line[0][0], line[0][1], line[1][0], line[1][1])
-                    if point in line_points:
-                        return i
+            # Empty cells (most of a big grid) need no lookup
+            if canvas.is_visible(grid_x, grid_y) and cells.get(point) != EMPTY:
+                return cell_index.first_line_at(point)
         return -1
 
 def apply_setting_value():
@@ -628,11 +961,11 @@ def apply_setting_value():
             program_data["grid_cell_size"] = value
         elif active_setting == SETTING_GRID_WIDTH:
             # Restrict to valid range
-            value = max(5, min(value, 200))
+            value = max(MIN_GRID_SIZE, min(value, MAX_GRID_SIZE))
             program_data["grid_width"] = value
         elif active_setting == SETTING_GRID_HEIGHT:
             # Restrict to valid range
-            value = max(5, min(value, 200))
+            value = max(MIN_GRID_SIZE, min(value, MAX_GRID_SIZE))
             program_data["grid_height"] = value
     except ValueError:
         # If the input isn't a valid number, don't update
@@ -649,11 +982,10 @@ def convert_mouse_to_grid(mouse_pos):
     
     # Only convert if mouse is in the grid area
     if adjusted_y >= 0:
-        grid_x = math.floor(mouse_pos[0] / grid.cell_size)
-        grid_y = math.floor(adjusted_y / grid.cell_size)
+        grid_x, grid_y = grid.convert_world_coordinates_to_grid_coordinates(mouse_pos[0], adjusted_y)
         
-        # Check if within grid bounds
-        if 0 <= grid_x < program_data["grid_width"] and 0 <= grid_y < program_data["grid_height"]:
+        # Check if within grid bounds and in view
+        if canvas.is_visible(grid_x, grid_y) and cells.contains(grid_x, grid_y):
             return grid_x, grid_y
     
     return None  # Return None if not in grid area
@@ -669,7 +1001,9 @@ def show_feedback(message, color=COLOR_WHITE, duration=3000):
     draw_toolbar()
 
 def main():
-    global current_state, grid, first_point, preview_point, last_preview_line, active_color, lines, active_line_index, current_mode, active_setting, input_text
+    global current_state, grid, first_point, preview_point, last_preview_line, active_color, lines, active_line_id, current_mode, active_setting, input_text
+    
+    init_display()
     
     running = True
     start_button = None
@@ -678,7 +1012,12 @@ def main():
     previous_state = None
     
     while running:
-        mouse_pos = pygame.mouse.get_pos()
+        profiler.start_frame()
+        
+        if save_job is not None and save_job.done():
+            finish_save()
+        if export_job is not None:
+            update_export_progress()
         
         # Only redraw what needs to be redrawn
         if current_state != previous_state:
@@ -696,57 +1035,17 @@ def main():
         elif current_state in (STATE_DRAWING, STATE_LINE1, STATE_LINE2):
             if needs_redraw:
                 screen_manager.fill(COLOR_BLACK)
-                grid.draw_grid()
+                canvas.invalidate()
                 needs_redraw = False
             
-            # Draw all saved lines - only redraw if there's a change
-            for i, (line, color) in enumerate(lines):
-                line_points = bresenham_line(line[0][0], line[0][1], line[1][0], line[1][1])
-                
-                # Highlight the active line
-                line_color = COLOR_GREY if i == active_line_index else color
-                
-                for point in line_points:
-                    x, y = point
-                    if 0 <= x < program_data["grid_width"] and 0 <= y < program_data["grid_height"]:
-                        cell_rect = pygame.Rect(x * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT, 
-                                              grid.cell_size, grid.cell_size)
-                        screen_manager.draw_rect(line_color, cell_rect)
-            
-            # Preview line if we have a first point and mouse is over the grid
-            if current_state == STATE_LINE1 and first_point:
-                # Get grid coordinates using our new helper function
-                grid_coords = convert_mouse_to_grid(mouse_pos)
-                
-                if grid_coords:
-                    grid_x, grid_y = grid_coords
-                    current_preview = (grid_x, grid_y)
-                    if current_preview != preview_point:
-                        preview_point = current_preview
-                        draw_preview_line(first_point, preview_point)
-            
-            # Redraw grid lines to see cell boundaries clearly
-            # Determine line thickness based on cell size
-            if grid.cell_size < 20:
-                line_thickness = 1
-            elif grid.cell_size < 40:
-                line_thickness = 1
-            else:
-                line_thickness = 2
-                
-            for x in range(0, program_data["grid_width"] + 1):
-                screen_manager.draw_line(COLOR_GREY, 
-                                        (x * grid.cell_size, TOOLBAR_HEIGHT), 
-                                        (x * grid.cell_size, program_data["grid_height"] * grid.cell_size + TOOLBAR_HEIGHT),
-                                        line_thickness)
-            for y in range(0, program_data["grid_height"] + 1):
-                screen_manager.draw_line(COLOR_GREY, 
-                                        (0, y * grid.cell_size + TOOLBAR_HEIGHT), 
-                                        (program_data["grid_width"] * grid.cell_size, y * grid.cell_size + TOOLBAR_HEIGHT),
-                                        line_thickness)
+            # Copy whatever changed on the canvas (nothing on idle frames)
+            canvas.blit_to(screen_manager, 0, TOOLBAR_HEIGHT)
+            profiler.lap("lines")
             
             # Draw toolbar
             color_rect, pen_rect, eraser_rect, save_rect, export_rect = draw_toolbar()
+            profiler.draw_hud(screen_manager, 240, 36)
+            profiler.lap("toolbar")
             
         # Color selection screen
         elif current_state == STATE_COLOR_SELECT and needs_redraw:
@@ -755,10 +1054,17 @@ def main():
             needs_redraw = False
             
         # Event handling
+        profiler.lap("lines")  # Drawing done outside the drawing screen
+        # Motion only matters for the preview, so just keep the latest position of the frame
+        latest_motion = None
         for event in pygame.event.get():
             if event.type == QUIT:
                 running = False
                 
+            elif event.type == MOUSEBUTTONDOWN and event.button > 3:
+                # Wheel turns also arrive as MOUSEWHEEL, which zooms
+                pass
+                
             elif event.type == MOUSEBUTTONDOWN:
                 if current_state == STATE_START_SCREEN:
                     if start_button and start_button.collidepoint(event.pos):
@@ -804,12 +1110,11 @@ def main():
                         current_mode = MODE_ERASE
                         needs_redraw = True  # Update toolbar to show selected tool
                         # Check if clicking on existing line to erase it
-                        line_index = find_line_at_point(event.pos)
-                        if line_index >= 0:
+                        line_id = find_line_at_point(event.pos)
+                        if line_id >= 0:
                             # Erase the line by removing it from the lines list
-                            lines.pop(line_index)
-                            active_line_index = -1
-                            needs_redraw = True  # Force redraw to update the screen
+                            set_active_line(-1)
+                            erase_line(line_id)
                     elif save_rect.collidepoint(event.pos):
                         # Save drawing
                         if not save_drawing():
@@ -820,19 +1125,18 @@ def main():
                             running = False
                     else:
                         # Check if clicking on existing line
-                        line_index = find_line_at_point(event.pos)
-                        if line_index >= 0:
+                        line_id = find_line_at_point(event.pos)
+                        if line_id >= 0:
                             if current_mode == MODE_ERASE:
                                 # In eraser mode, delete the line
-                                lines.pop(line_index)
-                                active_line_index = -1
-                                needs_redraw = True
-                            elif line_index == active_line_index:
+                                set_active_line(-1)
+                                erase_line(line_id)
+                            elif line_id == active_line_id:
                                 # In pen mode, if already selected, deselect it
-                                active_line_index = -1
+                                set_active_line(-1)
                             else:
                                 # In pen mode, select the line
-                                active_line_index = line_index
+                                set_active_line(line_id)
                         elif current_mode == MODE_PEN:
                             # Use our consistent coordinate conversion function
                             grid_coords = convert_mouse_to_grid(event.pos)
@@ -841,7 +1145,7 @@ def main():
                                 first_point = (grid_x, grid_y)
                                 preview_point = (grid_x, grid_y)
                                 current_state = STATE_LINE1
-                                active_line_index = -1  # Deselect any selected line
+                                set_active_line(-1)  # Deselect any selected line
                 
                 elif current_state == STATE_LINE1:
                     # Adjust mouse position to account for toolbar offset
@@ -849,20 +1153,18 @@ def main():
                     
                     # Only proceed if mouse is in grid area
                     if adjusted_y >= 0:
-                        grid_x = math.floor(event.pos[0]/grid.cell_size)
-                        grid_y = math.floor(adjusted_y/grid.cell_size)
+                        grid_x, grid_y = grid.convert_world_coordinates_to_grid_coordinates(event.pos[0], adjusted_y)
                         
-                        if 0 <= grid_x < program_data["grid_width"] and 0 <= grid_y < program_data["grid_height"]:
+                        if canvas.is_visible(grid_x, grid_y) and cells.contains(grid_x, grid_y):
                             # Clean up the preview line
                             clean_preview_line()
                             
                             # Complete the line
                             second_point = (grid_x, grid_y)
-                            lines.append([(first_point, second_point), active_color])
+                            commit_line((first_point, second_point), active_color)
                             first_point = None
                             preview_point = None
                             current_state = STATE_DRAWING
-                            needs_redraw = True  # Force redraw to show the new line properly
                 
                 elif current_state == STATE_COLOR_SELECT:
                     color_rects, cancel_button = draw_color_selector()
@@ -878,21 +1180,24 @@ def main():
                     if cancel_button.collidepoint(event.pos):
                         current_state = STATE_DRAWING
             
+            elif event.type == MOUSEWHEEL:
+                if current_state in (STATE_DRAWING, STATE_LINE1):
+                    zoom_view(event.y, pygame.mouse.get_pos())
+                    needs_redraw = True
+            
             elif event.type == MOUSEMOTION:
-                if current_state == STATE_LINE1:
-                    # Use our consistent coordinate conversion function
-                    grid_coords = convert_mouse_to_grid(event.pos)
-                    if grid_coords:
-                        grid_x, grid_y = grid_coords
-                        # Only update if we moved to a different grid cell
-                        current_preview = (grid_x, grid_y)
-                        if current_preview != preview_point:
-                            preview_point = current_preview
-                            draw_preview_line(first_point, preview_point)
+                input_stats["motion_received"] += 1
+                profiler.count("motion")
+                if latest_motion is not None:
+                    input_stats["motion_coalesced"] += 1
+                latest_motion = event.pos
             
             # Handle ESC key to cancel line drawing and other keyboard inputs
             elif event.type == KEYDOWN:
-                if current_state == STATE_START_SCREEN:
+                if event.key == K_F3:
+                    # Show or hide the frame profiler
+                    profiler.toggle()
+                elif current_state == STATE_START_SCREEN:
                     # Handle direct keyboard input for settings
                     if active_setting != SETTING_NONE:
                         if event.key == K_ESCAPE:
@@ -908,7 +1213,8 @@ def main():
                             # Remove last character
                             input_text = input_text[:-1]
                             needs_redraw = True
-                        elif event.unicode.isdigit() and len(input_text) < 3:
+                        elif event.unicode.isdigit() and len(input_text) < \
+                                (3 if active_setting == SETTING_CELL_SIZE else len(str(MAX_GRID_SIZE))):
                             # Add digit to input text if it's not too long
                             input_text += event.unicode
                             needs_redraw = True
@@ -926,24 +1232,33 @@ def main():
                     elif event.key == K_LEFT:
                         if pygame.key.get_mods() & KMOD_SHIFT:
                             program_data["grid_height"] -= 1
-                            if program_data["grid_height"] < 5:
-                                program_data["grid_height"] = 5
+                            if program_data["grid_height"] < MIN_GRID_SIZE:
+                                program_data["grid_height"] = MIN_GRID_SIZE
                         else:
                             program_data["grid_width"] -= 1
-                            if program_data["grid_width"] < 5:
-                                program_data["grid_width"] = 5
+                            if program_data["grid_width"] < MIN_GRID_SIZE:
+                                program_data["grid_width"] = MIN_GRID_SIZE
                         needs_redraw = True
                     elif event.key == K_RIGHT:
                         if pygame.key.get_mods() & KMOD_SHIFT:
                             program_data["grid_height"] += 1
-                            if program_data["grid_height"] > 20:
-                                program_data["grid_height"] = 20
+                            if program_data["grid_height"] > MAX_GRID_SIZE:
+                                program_data["grid_height"] = MAX_GRID_SIZE
                         else:
                             program_data["grid_width"] += 1
-                            if program_data["grid_width"] > 20:
-                                program_data["grid_width"] = 20
+                            if program_data["grid_width"] > MAX_GRID_SIZE:
+                                program_data["grid_width"] = MAX_GRID_SIZE
                         needs_redraw = True
                     
+                # Pan and zoom the view while drawing
+                elif current_state in (STATE_DRAWING, STATE_LINE1) and event.key in PAN_KEYS:
+                    dx, dy = PAN_KEYS[event.key]
+                    pan_view(dx * max(1, canvas.width // 4), dy * max(1, canvas.height // 4))
+                    needs_redraw = True
+                elif current_state in (STATE_DRAWING, STATE_LINE1) and event.key in ZOOM_IN_KEYS + ZOOM_OUT_KEYS:
+                    zoom_view(1 if event.key in ZOOM_IN_KEYS else -1, pygame.mouse.get_pos())
+                    needs_redraw = True
+                
                 # Add ESC key handling when in the middle of drawing a line
                 elif current_state == STATE_LINE1 and event.key == K_ESCAPE:
                     # Cancel the current line drawing operation
@@ -962,11 +1277,30 @@ def main():
                     color_rect, pen_rect, eraser_rect, save_rect, export_rect = draw_toolbar()
                 pygame.time.set_timer(pygame.USEREVENT + 1, 0)  # Disable the timer
     
+        profiler.lap("events")
+        
+        # Preview line if we have a first point and the mouse moved over the grid.
+        # Skipped on the frame the state changed, the next frame's cleanup would wipe it
+        if latest_motion is not None and current_state == STATE_LINE1 and first_point \
+                and current_state == previous_state:
+            # Use our consistent coordinate conversion function
+            grid_coords = convert_mouse_to_grid(latest_motion)
+            # Only update if we moved to a different grid cell
+            if grid_coords and grid_coords != preview_point:
+                preview_point = grid_coords
+                draw_preview_line(first_point, preview_point)
+        profiler.lap("preview")
+        
         screen_manager.update()
+        profiler.lap("update")
+        profiler.end_frame()
         clock.tick(60)
     
+    profiler.close()
     pygame.quit()
 
 # Execute game:
 if __name__ == "__main__":
+    # Frozen builds start load_cells()'s worker processes by re-running this script
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,137 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+PNG export that never holds the whole image in memory
+The drawing is rendered in horizontal tiles and each tile's rows go straight
+into a streaming PNG encoder. The cells come from a SparseCanvas, so only a band
+of the grid is ever dense. Needs no display, so it can run in a worker thread
+"""
+
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from bresenham_line import bresenham_line_batch_parallel
+from colors import COLOR_BLACK, COLOR_GREY
+from initial_values import GRID_LINE_MIN_CELL_PIXELS
+from sparse_canvas import SparseCanvas, EMPTY
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+TILE_PIXELS = 1 << 20  # About how many pixels to render at once
+IDAT_SIZE = 1 << 16  # Compressed bytes per IDAT chunk
+
+class PngWriter:
+    """Writes an 8-bit RGB PNG one band of rows at a time"""
+
+    def __init__(self, f, width, height):
+        self.f = f
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        self.pending = b""
+        f.write(PNG_SIGNATURE)
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, kind, data):
+        self.f.write(struct.pack(">I", len(data)))
+        self.f.write(kind)
+        self.f.write(data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    def write_rows(self, rows):
+        """Add an (n, width, 3) uint8 array of rows"""
+        # Every row starts with its filter type, 0 (none)
+        filtered = np.zeros((len(rows), self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 1:] = rows.reshape(len(rows), -1)
+        self.pending += self.compressor.compress(filtered.tobytes())
+        while len(self.pending) >= IDAT_SIZE:
+            self.write_chunk(b"IDAT", self.pending[:IDAT_SIZE])
+            self.pending = self.pending[IDAT_SIZE:]
+
+    def close(self):
+        self.pending += self.compressor.flush()
+        if self.pending:
+            self.write_chunk(b"IDAT", self.pending)
+        self.write_chunk(b"IEND", b"")
+
+def band_colors(cells, line_colors, top, rows):
+    """
+    Get the cell colors of grid rows [top, top + rows) as a rows x width x 3 array
+    `cells` is a SparseCanvas and `line_colors` an N x 3 array of line colors; only its drawn tiles are read
+    """
+    colors = np.zeros((rows, cells.width, 3), dtype=np.uint8)
+    colors[:] = COLOR_BLACK
+    for tile_x, tile_y, tile in cells.tiles_in(0, top, cells.width, top + rows):
+        # The part of the tile inside the band, turned from [x, y] to [y, x]
+        first = max(top - tile_y, 0)
+        part = tile[:cells.width - tile_x, first:top + rows - tile_y].T
+        ys, xs = np.nonzero(part != EMPTY)
+        colors[tile_y + first - top + ys, tile_x + xs] = line_colors[part[ys, xs]]
+    return colors
+
+def export_cells(path, cells, line_colors, cell_pixels, progress=None):
+    """
+    Export a SparseCanvas as a PNG with `cell_pixels` pixels per cell
+    `line_colors` lists the color of every line the cells refer to.
+    Grid lines are drawn when cells are at least GRID_LINE_MIN_CELL_PIXELS wide.
+    `progress`, if given, is called with the finished fraction after every tile.
+    A failed export leaves no partial file behind
+    """
+    line_colors = np.array([color[:3] for color in line_colors], dtype=np.uint8).reshape(-1, 3)
+    width, height = cells.width, cells.height
+    image_width = width * cell_pixels
+    grid_lines = cell_pixels >= GRID_LINE_MIN_CELL_PIXELS
+    tile_rows = max(1, TILE_PIXELS // max(1, image_width * cell_pixels))  # in cells
+    batch_rows = max(1, TILE_PIXELS // max(1, image_width))  # Pixel rows written at once
+
+    temp_path = path + ".tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            writer = PngWriter(f, image_width, height * cell_pixels)
+            for top in range(0, height, tile_rows):
+                # Blow each cell up to cell_pixels wide, then to cell_pixels tall
+                colors = band_colors(cells, line_colors, top, min(tile_rows, height - top))
+                band = np.repeat(colors, cell_pixels, axis=1)
+                if grid_lines:
+                    band[:, ::cell_pixels] = COLOR_GREY
+                if len(band) * cell_pixels <= batch_rows:
+                    tile = np.repeat(band, cell_pixels, axis=0)
+                    if grid_lines:
+                        tile[::cell_pixels] = COLOR_GREY
+                    writer.write_rows(tile)
+                else:
+                    # A single row of cells is already over budget (a very wide grid),
+                    # so write its pixel rows a batch at a time
+                    for row in band:
+                        remaining = cell_pixels
+                        if grid_lines:
+                            writer.write_rows(np.full((1, image_width, 3), COLOR_GREY, dtype=np.uint8))
+                            remaining -= 1
+                        while remaining:
+                            count = min(remaining, batch_rows)
+                            writer.write_rows(np.broadcast_to(row, (count, image_width, 3)))
+                            remaining -= count
+                if progress:
+                    progress(min(top + tile_rows, height) / height)
+            writer.close()
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+def export_png(path, width, height, lines, cell_pixels, progress=None, workers=None):
+    """
+    Export a width x height cell drawing, given as [(start, end), color] lines, as a PNG
+    Where lines overlap the later line wins, as when they are drawn in order.
+    Big drawings are rasterized on `workers` processes (default one per CPU)
+    """
+    cells = SparseCanvas(width, height)
+    if lines:
+        xs, ys, offsets = bresenham_line_batch_parallel([(x0, y0, x1, y1) for ((x0, y0), (x1, y1)), color in lines],
+                                                        workers)
+        cells.load(xs, ys, np.repeat(np.arange(len(lines), dtype=np.int32), np.diff(offsets)))
+    export_cells(path, cells, [color for line, color in lines], cell_pixels, progress)
@@ -0,0 +1,120 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+import json
+import time
+from collections import deque
+
+import pygame
+from colors import *
+
+class FrameProfiler:
+    """
+    Opt-in per-frame timing of the main loop
+    Each frame is split into phases with lap(), hot calls are tallied with count(),
+    and the rolling averages can be shown as a HUD or dumped to a JSON lines file
+    """
+    PHASES = ("events", "lines", "preview", "grid", "toolbar", "update")
+    # Short HUD labels for each phase
+    LABELS = {"events": "ev", "lines": "ln", "preview": "pv", "grid": "gr", "toolbar": "tb", "update": "up"}
+
+    def __init__(self, enabled=False, history=120, dump_path=None):
+        self.enabled = enabled
+        self.history = deque(maxlen=history)  # Finished frames, newest last
+        self.dump_path = dump_path
+        self.dump_file = None
+        self.font = None  # Created on first HUD draw
+        self.frame = None
+        self.counters = {}
+        self.frame_start = 0.0
+        self.last_lap = 0.0
+        self.nested = 0.0  # Time already booked by add_time() during the current lap
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.history.clear()
+        self.frame = None
+
+    def clock(self):
+        return time.perf_counter()
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.frame = dict.fromkeys(self.PHASES, 0.0)
+        self.counters = {}
+        self.frame_start = self.last_lap = time.perf_counter()
+        self.nested = 0.0
+
+    def lap(self, phase):
+        """Book the time since the previous lap to `phase`"""
+        if not self.enabled or self.frame is None:
+            return
+        now = time.perf_counter()
+        self.frame[phase] += now - self.last_lap - self.nested
+        self.last_lap = now
+        self.nested = 0.0
+
+    def add_time(self, phase, start):
+        """Book the time since `start` (from clock()) to `phase`, taking it out of the current lap"""
+        if not self.enabled or self.frame is None:
+            return
+        elapsed = time.perf_counter() - start
+        self.frame[phase] += elapsed
+        self.nested += elapsed
+
+    def count(self, name, amount=1):
+        """Tally a hot call for the current frame"""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_frame(self):
+        if not self.enabled or self.frame is None:
+            return
+        record = {"total": time.perf_counter() - self.frame_start, **self.frame, "counts": self.counters}
+        self.history.append(record)
+        self.frame = None
+        if self.dump_path:
+            self.dump(record)
+
+    def dump(self, record):
+        """Append one frame to the dump file, in milliseconds"""
+        if self.dump_file is None:
+            self.dump_file = open(self.dump_path, "a")
+        line = {key: (round(value * 1000, 3) if key != "counts" else value) for key, value in record.items()}
+        self.dump_file.write(json.dumps(line) + "\n")
+
+    def close(self):
+        if self.dump_file is not None:
+            self.dump_file.close()
+            self.dump_file = None
+
+    def averages(self):
+        """Rolling averages over the kept frames: seconds per phase and calls per counter"""
+        if not self.history:
+            return {}
+        frames = len(self.history)
+        result = {key: sum(frame[key] for frame in self.history) / frames for key in ("total",) + self.PHASES}
+        counts = {}
+        for frame in self.history:
+            for name, amount in frame["counts"].items():
+                counts[name] = counts.get(name, 0) + amount
+        result["counts"] = {name: amount / frames for name, amount in counts.items()}
+        return result
+
+    def draw_hud(self, screen_manager, x, y):
+        """Draw a one-line summary of the rolling averages"""
+        averages = self.averages()
+        if not self.enabled or not averages:
+            return
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("Arial", 12)
+        text = f"{averages['total'] * 1000:.1f}ms |"
+        for phase in self.PHASES:
+            text += f" {self.LABELS[phase]} {averages[phase] * 1000:.1f}"
+        for name, amount in sorted(averages["counts"].items()):
+            text += f" | {name} {amount:.0f}"
+        surface = self.font.render(text, True, COLOR_YELLOW)
+        screen_manager.blit(surface, (x, y))
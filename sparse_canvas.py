@@ -0,0 +1,159 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Sparse storage for which line is drawn on top of each cell
+The grid is cut into fixed-size tiles and a tile only exists once something is
+drawn in it, so memory follows the drawn cells instead of the grid's area
+"""
+
+import numpy as np
+
+TILE_SIZE = 32  # Cells per tile side
+EMPTY = -1  # Cell value where no line is drawn
+
+class SparseCanvas:
+    """
+    The index of the top (latest) line of every cell of a width x height grid
+    Tiles are TILE_SIZE x TILE_SIZE int32 arrays indexed [x, y], like Grid.cells
+    """
+
+    def __init__(self, width, height, tile_size=TILE_SIZE):
+        self.width = width  # in cells
+        self.height = height  # in cells
+        self.tile_size = tile_size
+        self.tiles = {}  # (tile x, tile y) -> tile array, only for tiles with something drawn
+        self.maybe_empty = set()  # Tiles that had cells cleared, checked by release_empty()
+
+    def contains(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get(self, point):
+        """Get the index of the line on top at `point`, or EMPTY"""
+        x, y = point
+        tile = self.tiles.get((x // self.tile_size, y // self.tile_size))
+        if tile is None or not self.contains(x, y):
+            return EMPTY
+        return int(tile[x % self.tile_size, y % self.tile_size])
+
+    def set(self, point, value):
+        """Set one cell; cells off the grid are ignored"""
+        x, y = point
+        if not self.contains(x, y):
+            return
+        key = (x // self.tile_size, y // self.tile_size)
+        tile = self.tiles.get(key)
+        if tile is None:
+            if value == EMPTY:
+                return
+            tile = self.tiles[key] = np.full((self.tile_size, self.tile_size), EMPTY, dtype=np.int32)
+        tile[x % self.tile_size, y % self.tile_size] = value
+        if value == EMPTY:
+            self.maybe_empty.add(key)
+
+    def paint(self, points, value):
+        """Set every on-grid cell in `points` to `value` (a newly drawn line goes on top of everything)"""
+        if not points:
+            return
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        xs, ys = points[:, 0], points[:, 1]
+        self.load(xs, ys, np.full(len(xs), value, dtype=np.int32))
+
+    def load(self, xs, ys, values):
+        """
+        Set many cells at once from arrays of x, y and line index
+        Each cell keeps the highest index it is given or already has, which is the line drawn last
+        """
+        xs, ys, values = np.asarray(xs), np.asarray(ys), np.asarray(values, dtype=np.int32)
+        on_grid = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys, values = xs[on_grid], ys[on_grid], values[on_grid]
+        if len(xs) == 0:
+            return
+
+        size = self.tile_size
+        tiles_across = (self.width + size - 1) // size
+        keys, slots = np.unique((ys // size).astype(np.int64) * tiles_across + xs // size, return_inverse=True)
+
+        # Write every touched tile in one go: copy them into a block and update it
+        block = np.full((len(keys), size, size), EMPTY, dtype=np.int32)
+        keys = [(key % tiles_across, key // tiles_across) for key in keys.tolist()]
+        for slot, key in enumerate(keys):
+            tile = self.tiles.get(key)
+            if tile is not None:
+                block[slot] = tile
+        np.maximum.at(block, (slots, xs % size, ys % size), values)
+        # Each tile gets its own copy, so freeing one tile never depends on the others
+        for slot, key in enumerate(keys):
+            self.tiles[key] = block[slot].copy()
+
+    def release_empty(self):
+        """Free tiles that no longer have anything drawn in them"""
+        for key in self.maybe_empty:
+            tile = self.tiles.get(key)
+            if tile is not None and (tile == EMPTY).all():
+                del self.tiles[key]
+        self.maybe_empty = set()
+
+    def tiles_in(self, x0, y0, x1, y1):
+        """Yield (x, y, tile) for the allocated tiles overlapping cells [x0, x1) x [y0, y1); x, y is the tile's first cell"""
+        size = self.tile_size
+        tx0, ty0 = max(x0, 0) // size, max(y0, 0) // size
+        tx1, ty1 = (min(x1, self.width) - 1) // size, (min(y1, self.height) - 1) // size
+        if tx1 < tx0 or ty1 < ty0:
+            return
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) <= len(self.tiles):
+            # Small area: look its tiles up
+            for ty in range(ty0, ty1 + 1):
+                for tx in range(tx0, tx1 + 1):
+                    tile = self.tiles.get((tx, ty))
+                    if tile is not None:
+                        yield tx * size, ty * size, tile
+        else:
+            # Few tiles: check each of them
+            for (tx, ty), tile in self.tiles.items():
+                if tx0 <= tx <= tx1 and ty0 <= ty <= ty1:
+                    yield tx * size, ty * size, tile
+
+    def drawn_cells(self, x0, y0, x1, y1):
+        """Yield (x, y, line index) for every drawn cell in [x0, x1) x [y0, y1)"""
+        for tile_x, tile_y, tile in self.tiles_in(x0, y0, x1, y1):
+            # Only the part of the tile inside the area
+            left, top = max(x0 - tile_x, 0), max(y0 - tile_y, 0)
+            part = tile[left:x1 - tile_x, top:y1 - tile_y]
+            for x, y in zip(*np.nonzero(part != EMPTY)):
+                yield tile_x + left + int(x), tile_y + top + int(y), int(part[x, y])
+
+    def drawn_spans(self, x0, y0, x1, y1):
+        """
+        Yield ((x, y, run_length, "x"), line index) for the drawn cells in [x0, x1) x [y0, y1),
+        with each row's neighbouring cells of the same line joined into one run (runs stop at tile edges)
+        """
+        for tile_x, tile_y, tile in self.tiles_in(x0, y0, x1, y1):
+            left, top = max(x0 - tile_x, 0), max(y0 - tile_y, 0)
+            rows = tile[left:x1 - tile_x, top:y1 - tile_y].T
+            height, width = rows.shape
+            # A run starts wherever the index changes along a row; each row also ends at `width`
+            starts = np.ones((height, width + 1), dtype=bool)
+            starts[:, 1:width] = rows[:, 1:] != rows[:, :-1]
+            row_of, column_of = np.nonzero(starts)
+            # Boundaries come row by row, so the next one always closes the current run
+            lengths = column_of[1:] - column_of[:-1]
+            row_of, column_of = row_of[:-1], column_of[:-1]
+            inside = column_of < width
+            row_of, column_of, lengths = row_of[inside], column_of[inside], lengths[inside]
+            values = rows[row_of, column_of]
+            drawn = values != EMPTY
+            for y, x, length, value in zip(row_of[drawn].tolist(), column_of[drawn].tolist(),
+                                           lengths[drawn].tolist(), values[drawn].tolist()):
+                yield (tile_x + left + x, tile_y + top + y, length, "x"), value
+
+    def copy(self):
+        """A snapshot that later edits do not change (for background exports)"""
+        snapshot = SparseCanvas(self.width, self.height, self.tile_size)
+        snapshot.tiles = {key: tile.copy() for key, tile in self.tiles.items()}
+        return snapshot
+
+    def memory(self):
+        """Bytes used by the allocated tiles"""
+        return sum(tile.nbytes for tile in self.tiles.values())
@@ -0,0 +1,134 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Checks the faster rasterizers against bresenham_line(), cell for cell
+Every line with both ends in a small block is tried, plus random long lines
+Run with python -m pytest
+"""
+
+import random
+
+import numpy as np
+
+from bresenham_line import (bresenham_line, bresenham_line_batch, bresenham_line_batch_parallel, bresenham_line_clipped,
+                            bresenham_spans, iter_bresenham_line, line_covers_cell, span_cells, PatternCache)
+
+SMALL = range(-3, 4)
+
+def small_lines():
+    """Every (x0, y0, x1, y1) with both ends in a 7 x 7 block around the origin"""
+    return [(x0, y0, x1, y1) for x0 in SMALL for y0 in SMALL for x1 in SMALL for y1 in SMALL]
+
+def random_lines(count, reach=5000, seed=1):
+    """Long lines with both ends anywhere in [-reach, reach]"""
+    rng = random.Random(seed)
+    return [tuple(rng.randint(-reach, reach) for _ in range(4)) for _ in range(count)]
+
+def small_clips():
+    """Clip rects (left, top, right, bottom) around the small block, empty ones included"""
+    edges = [(low, low + size) for low in range(-4, 4, 2) for size in (0, 1, 2, 5)]
+    return [(left, top, right, bottom) for left, right in edges for top, bottom in edges]
+
+def random_clips(count, reach=5000, seed=1):
+    """Clip rects of any size inside [-reach, reach]"""
+    rng = random.Random(seed)
+    clips = []
+    for _ in range(count):
+        left, top = rng.randint(-reach, reach), rng.randint(-reach, reach)
+        clips.append((left, top, left + rng.randint(1, reach), top + rng.randint(1, reach)))
+    return clips
+
+def clipped(line, clip):
+    """The cells of bresenham_line() inside `clip`, the slow way"""
+    left, top, right, bottom = clip
+    return [(x, y) for x, y in bresenham_line(*line) if left <= x < right and top <= y < bottom]
+
+def check_spans(spans, cells):
+    """Check that the spans cover exactly `cells`, one run after another in line order"""
+    start = 0
+    for span in spans:
+        assert span[2] > 0
+        run = span_cells(span)
+        assert set(run) == set(cells[start:start + len(run)])
+        start += len(run)
+    assert start == len(cells)
+
+def batch_lines(xs, ys, offsets):
+    """Split a batch's columns back into a list of cells per line"""
+    xs, ys, offsets = xs.tolist(), ys.tolist(), offsets.tolist()
+    return [list(zip(xs[start:end], ys[start:end])) for start, end in zip(offsets, offsets[1:])]
+
+def test_batch_small_lines():
+    ends = small_lines()
+    assert batch_lines(*bresenham_line_batch(np.array(ends))) == [bresenham_line(*line) for line in ends]
+
+def test_batch_random_long_lines():
+    ends = random_lines(200)
+    assert batch_lines(*bresenham_line_batch(np.array(ends))) == [bresenham_line(*line) for line in ends]
+
+def test_batch_no_lines():
+    xs, ys, offsets = bresenham_line_batch(np.zeros((0, 4), dtype=np.int64))
+    assert len(xs) == len(ys) == 0
+    assert offsets.tolist() == [0]
+
+def test_batch_parallel_matches_batch():
+    ends = np.array(random_lines(50, seed=2))
+    expected = bresenham_line_batch(ends)
+    result = bresenham_line_batch_parallel(ends, workers=2, min_cells=0)
+    assert all(np.array_equal(a, b) for a, b in zip(expected, result))
+
+def test_clipped_small_lines():
+    for clip in small_clips():
+        for line in small_lines():
+            assert bresenham_line_clipped(*line, clip) == clipped(line, clip)
+
+def test_clipped_random_long_lines():
+    for line, clip in zip(random_lines(300), random_clips(300)):
+        assert bresenham_line_clipped(*line, clip) == clipped(line, clip)
+    # Long lines crossing a window-sized view
+    view = (0, 0, 200, 150)
+    for line in random_lines(300, reach=1000, seed=3):
+        assert bresenham_line_clipped(*line, view) == clipped(line, view)
+
+def test_spans_small_lines():
+    for line in small_lines():
+        check_spans(bresenham_spans(*line), bresenham_line(*line))
+    for clip in small_clips():
+        for line in small_lines():
+            check_spans(bresenham_spans(*line, clip), clipped(line, clip))
+
+def test_spans_random_long_lines():
+    for line, clip in zip(random_lines(300), random_clips(300)):
+        check_spans(bresenham_spans(*line), bresenham_line(*line))
+        check_spans(bresenham_spans(*line, clip), clipped(line, clip))
+
+def test_iter_matches_list():
+    for line in small_lines() + random_lines(100):
+        assert list(iter_bresenham_line(*line)) == bresenham_line(*line)
+
+def test_covers_cell_small_lines():
+    cells = [(x, y) for x in range(-4, 5) for y in range(-4, 5)]
+    for line in small_lines():
+        on_line = set(bresenham_line(*line))
+        for cell in cells:
+            assert line_covers_cell(*line, *cell) == (cell in on_line)
+
+def test_covers_cell_random_long_lines():
+    for line in random_lines(40):
+        on_line = set(bresenham_line(*line))
+        for x, y in on_line:
+            assert line_covers_cell(*line, x, y)
+            # The cells beside it are on the line only where it steps
+            for cell in ((x + 1, y), (x, y + 1), (x - 1, y), (x, y - 1)):
+                assert line_covers_cell(*line, *cell) == (cell in on_line)
+
+def test_pattern_cache_matches_list():
+    cache = PatternCache(size=64, max_cells=2000)
+    # Small lines share shapes from different starts (hits, and misses once evicted);
+    # some of the long lines are past max_cells and skip the cache
+    for line in small_lines() + random_lines(100, reach=1500):
+        assert cache.line(*line) == bresenham_line(*line)
+    assert cache.hits and cache.misses
+    assert len(cache.patterns) <= 64
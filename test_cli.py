@@ -0,0 +1,41 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Checks that cli.py reports a bad drawing and still handles the files next to it
+Run with python -m pytest
+"""
+
+import json
+
+import pytest
+
+import cli
+
+GOOD = {"grid_size": [20, 20], "cell_size": 4, "lines": [{"start": [1, 2], "end": [15, 9], "color": "#ff0000"}]}
+# A color with two numbers: the file parses as JSON but its values are wrong
+BAD = {"grid_size": [20, 20], "cell_size": 4, "lines": [{"start": [1, 2], "end": [5, 9], "color": [1, 2]}]}
+
+def write_files(folder):
+    good, bad = folder / "good.json", folder / "bad.json"
+    good.write_text(json.dumps(GOOD))
+    bad.write_text(json.dumps(BAD))
+    return str(good), str(bad)
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_render_bad_file_next_to_good_one(tmp_path, capsys, jobs):
+    good, bad = write_files(tmp_path)
+    args = cli.parse_args(["render", bad, good, "-j", jobs, "-d", str(tmp_path / "out")])
+    assert args.func(args) == 1
+    assert (tmp_path / "out" / "good.png").exists()
+    assert not (tmp_path / "out" / "bad.png").exists()
+    assert f"Error: {bad}:" in capsys.readouterr().err
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_convert_bad_file_next_to_good_one(tmp_path, capsys, jobs):
+    good, bad = write_files(tmp_path)
+    args = cli.parse_args(["convert", bad, good, "--to", "sldr", "-j", jobs, "-d", str(tmp_path / "out")])
+    assert args.func(args) == 1
+    assert (tmp_path / "out" / "good.sldr").exists()
+    assert f"Error: {bad}:" in capsys.readouterr().err
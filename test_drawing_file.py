@@ -0,0 +1,144 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Checks that drawings survive a save and load in both formats, journal included,
+and that bad files fail with the errors the editor and cli.py report
+Run with python -m pytest
+"""
+
+import json
+
+import pytest
+
+import drawing_file
+from drawing_file import DrawingFormatError
+
+LINES = [[((1, 2), (5, 9)), (255, 0, 0)],
+         [((0, 0), (19, 19)), (1, 2, 3)],
+         [((-4, 7), (12, -3)), (255, 0, 0)]]
+
+def write_json_text(folder, text):
+    path = folder / "bad.json"
+    path.write_text(text)
+    return str(path)
+
+def test_json_round_trip(tmp_path):
+    path = str(tmp_path / "d.json")
+    drawing_file.write_json(path, (20, 30), 12, LINES, "ab" * 16)
+    save_data, lines = drawing_file.read_json(path)
+    assert lines == LINES
+    assert save_data["grid_size"] == [20, 30] and save_data["cell_size"] == 12
+    assert save_data["revision"] == "ab" * 16
+
+def test_binary_round_trip(tmp_path):
+    path = str(tmp_path / "d.sldr")
+    drawing_file.write_binary(path, (20, 30), 12, LINES, "ab" * 16)
+    save_data, endpoints, color_indices, palette = drawing_file.read_binary(path)
+    assert save_data == {"grid_size": [20, 30], "cell_size": 12, "revision": "ab" * 16}
+    assert endpoints.tolist() == [[1, 2, 5, 9], [0, 0, 19, 19], [-4, 7, 12, -3]]
+    assert color_indices.tolist() == [0, 1, 0]
+    assert palette[:, :3].tolist() == [[255, 0, 0], [1, 2, 3]]
+    assert drawing_file.read_drawing(path)[1] == LINES
+
+def test_columns_match_in_both_formats(tmp_path):
+    for name in ("d.json", "d.sldr"):
+        path = str(tmp_path / name)
+        drawing_file.write_drawing(path, (20, 30), 12, LINES)
+        save_data, endpoints, color_indices, palette = drawing_file.read_columns(path)
+        colors = palette[:, :3].tolist()
+        assert [[((x0, y0), (x1, y1)), tuple(colors[index])]
+                for (x0, y0, x1, y1), index in zip(endpoints.tolist(), color_indices.tolist())] == LINES
+
+def test_no_lines(tmp_path):
+    for name in ("d.json", "d.sldr"):
+        path = str(tmp_path / name)
+        drawing_file.write_drawing(path, (5, 5), 10, [])
+        assert drawing_file.read_drawing(path)[1] == []
+        assert drawing_file.read_columns(path)[1].shape == (0, 4)
+
+def test_many_colors(tmp_path):
+    lines = [[((i, 0), (i, 5)), (i % 256, i // 256 % 256, i // 65536)] for i in range(70000)]
+    path = str(tmp_path / "d.json")
+    drawing_file.write_json(path, (70000, 6), 1, lines)
+    save_data, endpoints, color_indices, palette = drawing_file.read_columns(path)
+    assert len(palette) == 70000 and color_indices[-1] == 69999
+    # Too many colors for the binary format's uint16 indices
+    with pytest.raises(DrawingFormatError):
+        drawing_file.write_binary(str(tmp_path / "d.sldr"), (70000, 6), 1, lines)
+    assert not (tmp_path / "d.sldr").exists()
+
+@pytest.mark.parametrize("name", ["d.json", "d.sldr"])
+def test_journal_replay(tmp_path, name):
+    path = str(tmp_path / name)
+    revision = drawing_file.new_revision()
+    drawing_file.write_drawing(path, (20, 20), 10, LINES, revision)
+    drawing_file.append_journal(path, revision, [("add", ((3, 3), (8, 1)), (0, 0, 255)), ("erase", 0)])
+    drawing_file.append_journal(path, revision, [("erase", 1)])
+    save_data, lines, edit_count = drawing_file.read_drawing_with_journal(path)
+    assert edit_count == 3
+    assert lines == [LINES[1], [((3, 3), (8, 1)), (0, 0, 255)]]
+
+    # A save interrupted mid-edit keeps the edits before it
+    with open(drawing_file.journal_path(path), "a") as f:
+        f.write('{"op": "add", "start": [1')
+    assert drawing_file.read_drawing_with_journal(path)[1] == lines
+
+    # A journal written against another revision does not apply
+    drawing_file.write_drawing(path, (20, 20), 10, LINES, drawing_file.new_revision())
+    drawing_file.append_journal(path, revision, [("erase", 0)])
+    assert drawing_file.read_drawing_with_journal(path)[1] == LINES
+
+def test_full_save_drops_journal(tmp_path):
+    path = str(tmp_path / "d.json")
+    revision = drawing_file.new_revision()
+    drawing_file.write_json(path, (20, 20), 10, LINES, revision)
+    drawing_file.append_journal(path, revision, [("erase", 0)])
+    drawing_file.write_json(path, (20, 20), 10, LINES, revision)
+    assert drawing_file.read_journal(path, revision) == []
+
+def test_binary_too_short(tmp_path):
+    path = tmp_path / "d.sldr"
+    path.write_bytes(drawing_file.BINARY_MAGIC + b"xx")
+    with pytest.raises(DrawingFormatError, match="too short"):
+        drawing_file.read_columns(str(path))
+
+def test_binary_truncated(tmp_path):
+    path = tmp_path / "d.sldr"
+    drawing_file.write_binary(str(path), (20, 20), 10, LINES)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(DrawingFormatError, match="truncated"):
+        drawing_file.read_columns(str(path))
+
+def test_binary_bad_magic_and_version(tmp_path):
+    path = tmp_path / "d.sldr"
+    drawing_file.write_binary(str(path), (20, 20), 10, LINES)
+    data = path.read_bytes()
+    path.write_bytes(b"XXXX" + data[4:])
+    with pytest.raises(DrawingFormatError, match="not a binary drawing"):
+        drawing_file.read_binary(str(path))
+    # Without the magic bytes it is read as JSON, which fails with a ValueError (a UnicodeDecodeError here)
+    with pytest.raises(ValueError):
+        drawing_file.read_columns(str(path))
+    path.write_bytes(data[:4] + (drawing_file.BINARY_VERSION + 1).to_bytes(2, "little") + data[6:])
+    with pytest.raises(DrawingFormatError, match="version"):
+        drawing_file.read_columns(str(path))
+
+@pytest.mark.parametrize("text, error", [
+    ("{", json.JSONDecodeError),
+    ('{"grid_size": [20, 20], "cell_size": 30}', KeyError),
+    ('{"grid_size": [20, 20], "cell_size": 30, "lines": [{"start": [1], "end": [5, 9], "color": "#ff0000"}]}',
+     IndexError),
+    # A color with two numbers
+    ('{"grid_size": [20, 20], "cell_size": 30, "lines": [{"start": [1, 2], "end": [5, 9], "color": [1, 2]}]}',
+     ValueError),
+])
+def test_bad_json_values(tmp_path, text, error):
+    with pytest.raises(error):
+        drawing_file.read_columns(write_json_text(tmp_path, text))
+
+def test_old_point_format(tmp_path):
+    path = write_json_text(tmp_path, json.dumps({"grid_size": [20, 20], "cell_size": 30, "lines": [
+        {"start": {"x": 1, "y": 2}, "end": [5, 9], "color": "#ff0000"}]}))
+    assert drawing_file.read_drawing(path)[1] == [[((1, 2), (5, 9)), (255, 0, 0)]]
@@ -0,0 +1,46 @@
+# REN JOSEPH E. AYANGCO
+# EARLAN JOSH Q. SABILLANO
+# JEA KATRINA G. JALANDONI
+
+"""
+Rendered text kept between frames
+The toolbar, start screen and dialogs draw the same labels every frame, so each
+(text, font, color, antialias) is rendered once and the surface is blitted after that
+"""
+
+from collections import OrderedDict
+
+TEXT_CACHE_SIZE = 512  # Surfaces kept; the start screen's rainbow letters alone need a couple hundred
+
+class TextCache:
+    """Least recently used cache of text surfaces"""
+
+    def __init__(self, size=TEXT_CACHE_SIZE):
+        self.size = size
+        self.surfaces = OrderedDict()  # (text, font, color, antialias) -> surface
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        """Get font.render(text, antialias, color), rendering it only the first time"""
+        key = (text, font, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        # The surfaces are shared, callers only blit them
+        surface = self.surfaces[key] = font.render(text, antialias, color)
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces = OrderedDict()
+
+    def stats(self):
+        """Get the hit/miss counters"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.surfaces)}
+
+text_cache = TextCache()
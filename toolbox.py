@@ -4,6 +4,7 @@
 
 import pygame
 from colors import *
+from text_cache import text_cache
 
 class ToolBox:
     def __init__(self):
@@ -22,7 +23,7 @@ class ToolBox:
         self.selected_color = COLOR_WHITE
         self.clicked_action = None  # 'color', 'eraser', 'save', 'export'
 
-        self.font = pygame.font.SysFont("Arial", 16)
+        self.font = None  # Loaded on first draw, so a ToolBox can be made before pygame is set up
 
     def draw(self, surface):
         # Draw toolbar background
@@ -66,7 +67,10 @@ class ToolBox:
             pygame.draw.line(surface, (255, 0, 0), rect.topright, rect.bottomleft, 2)
 
         if text:
-            text_surface = self.font.render(text, True, COLOR_WHITE)
+            if self.font is None:
+                pygame.font.init()
+                self.font = pygame.font.SysFont("Arial", 16)
+            text_surface = text_cache.render(self.font, text, COLOR_WHITE)
             text_rect = text_surface.get_rect(center=rect.center)
             surface.blit(text_surface, text_rect)
 